@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Compare serial and thread-pool batched sysfs reads
+
+Times read_cpu_settings() and the batched state read on fake sysfs trees
+with the thread pool disabled and enabled. The same switch is available
+at runtime through CPUPOWER_GUI_PARALLEL_READS=0.
+
+Usage: python3 benchmarks/bench_batch.py [--cpus 64,256] [--workers N]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cpupower_gui import utils  # noqa: E402
+from cpupower_gui.config import read_cpu_settings  # noqa: E402
+from fake_sysfs import build_fake_sysfs  # noqa: E402
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1e3 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cpus", default="64,256")
+    parser.add_argument("--workers", type=int, default=utils.MAX_READ_WORKERS)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    utils.MAX_READ_WORKERS = args.workers
+
+    for ncpus in [int(n) for n in args.cpus.split(",")]:
+        with tempfile.TemporaryDirectory() as tmp:
+            build_fake_sysfs(tmp, cpus=ncpus, epp=True)
+            utils.set_sysfs_root(tmp)
+            cpus = utils.cpus_available()
+
+            for parallel in (False, True):
+                label = "parallel" if parallel else "serial"
+                states = timed(
+                    lambda: utils.read_cpu_states(cpus, parallel=parallel),
+                    args.repeat,
+                )
+                settings = timed(
+                    lambda: read_cpu_settings(cpus, parallel=parallel), args.repeat
+                )
+                print(
+                    "{:>5} CPUs  {:<8}  read_cpu_states {:>8.2f} ms"
+                    "  read_cpu_settings {:>8.2f} ms".format(
+                        ncpus, label, states, settings
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
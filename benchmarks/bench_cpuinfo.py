@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Benchmark the /proc/cpuinfo frequency parser at high CPU counts
+
+Compares parsing a synthetic x86 /proc/cpuinfo with sampling
+scaling_cur_freq from a fake sysfs tree with the same CPU count.
+
+Usage: python3 benchmarks/bench_cpuinfo.py [--cpus 64,256,1024,4096]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cpupower_gui import utils  # noqa: E402
+from fake_sysfs import build_fake_sysfs  # noqa: E402
+
+BLOCK = """processor\t: {cpu}
+vendor_id\t: GenuineIntel
+cpu family\t: 6
+model\t\t: 85
+model name\t: Intel(R) Xeon(R) Platinum 8280 CPU @ 2.70GHz
+stepping\t: 7
+microcode\t: 0x5003604
+cpu MHz\t\t: {mhz:.3f}
+cache size\t: 39424 KB
+physical id\t: {package}
+siblings\t: 56
+core id\t\t: {core}
+cpu cores\t: 28
+apicid\t\t: {cpu}
+fpu\t\t: yes
+fpu_exception\t: yes
+cpuid level\t: 22
+wp\t\t: yes
+flags\t\t: fpu vme de pse tsc msr pae mce cx8 apic sep mtrr pge mca cmov pat \
+pse36 clflush dts acpi mmx fxsr sse sse2 ss ht tm pbe syscall nx pdpe1gb rdtscp \
+lm constant_tsc art arch_perfmon pebs bts rep_good nopl xtopology nonstop_tsc \
+cpuid aperfmperf pni pclmulqdq dtes64 monitor ds_cpl vmx smx est tm2 ssse3 \
+sdbg fma cx16 xtpr pdcm pcid dca sse4_1 sse4_2 x2apic movbe popcnt avx512f
+bogomips\t: 5400.00
+clflush size\t: 64
+cache_alignment\t: 64
+address sizes\t: 46 bits physical, 48 bits virtual
+power management:
+
+"""
+
+
+def cpuinfo_text(ncpus):
+    return "".join(
+        BLOCK.format(cpu=cpu, mhz=1200 + cpu % 7, package=cpu // 56, core=cpu % 28)
+        for cpu in range(ncpus)
+    )
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1e3 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cpus", default="64,256,1024,4096")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for ncpus in [int(n) for n in args.cpus.split(",")]:
+        text = cpuinfo_text(ncpus)
+        assert len(utils.parse_cpuinfo_freqs(text)) == ncpus
+
+        with tempfile.TemporaryDirectory() as tmp:
+            build_fake_sysfs(tmp, cpus=ncpus)
+            utils.set_sysfs_root(tmp)
+            cpuinfo = Path(tmp, "cpuinfo")
+            cpuinfo.write_text(text)
+            utils.CPUINFO = cpuinfo
+
+            cpus = utils.cpus_available()
+            results = {
+                "parse only": timed(
+                    lambda: utils.parse_cpuinfo_freqs(text), args.repeat
+                ),
+            }
+            for name, backend in utils.FREQ_BACKENDS.items():
+                sampler = backend(cpus)
+                results[name + " sample"] = timed(sampler.sample, args.repeat)
+                sampler.close()
+            selected = utils.select_freq_sampler(cpus)
+            selected.close()
+
+        for name, elapsed in results.items():
+            print("{:>5} CPUs  {:<16} {:>8.2f} ms".format(ncpus, name, elapsed))
+        print("{:>5} CPUs  auto selects     {}".format(ncpus, type(selected).__name__))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Benchmark the cold start of the D-Bus helper
+
+Runs the import statements of cpupower-gui-helper.py.in in fresh
+interpreters and reports the median time of each one, plus the wall time
+of the whole interpreter against an empty one. Modules that are not
+installed (e.g. dbus on a build machine) are reported and skipped.
+
+Usage: python3 benchmarks/bench_helper_start.py [--repeat 10]
+"""
+
+import argparse
+import ast
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+HELPER = ROOT / "cpupower_gui" / "cpupower-gui-helper.py.in"
+
+CHILD = """
+import sys, time
+sys.path.insert(1, {root!r})
+results = []
+for stmt in {stmts!r}:
+    start = time.perf_counter()
+    try:
+        exec(stmt, {{}})
+        ok = True
+    except ImportError:
+        ok = False
+    results.append((stmt, time.perf_counter() - start, ok))
+print(repr(results))
+"""
+
+
+def helper_imports():
+    """Returns the module level import statements of the helper"""
+    source = HELPER.read_text().replace("@pkgdatadir@", str(ROOT))
+    tree = ast.parse(source)
+    return [
+        ast.get_source_segment(source, node)
+        for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+
+
+def run(code):
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    return time.perf_counter() - start, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    stmts = helper_imports()
+    code = CHILD.format(root=str(ROOT), stmts=stmts)
+
+    empty = statistics.median(run("pass")[0] for _ in range(args.repeat))
+    walls = []
+    timings = {stmt: [] for stmt in stmts}
+    missing = set()
+    for _ in range(args.repeat):
+        wall, out = run(code)
+        walls.append(wall)
+        for stmt, elapsed, ok in ast.literal_eval(out.strip()):
+            timings[stmt].append(elapsed)
+            if not ok:
+                missing.add(stmt)
+
+    print("{:<50} {:>10}".format("statement", "median ms"))
+    for stmt, values in timings.items():
+        note = "  (not installed)" if stmt in missing else ""
+        print("{:<50} {:>10.2f}{}".format(stmt, statistics.median(values) * 1e3, note))
+    print()
+    print("interpreter, empty:        {:8.2f} ms".format(empty * 1e3))
+    print(
+        "interpreter, with imports: {:8.2f} ms".format(statistics.median(walls) * 1e3)
+    )
+
+
+if __name__ == "__main__":
+    main()
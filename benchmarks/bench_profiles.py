@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Benchmark CpuPowerConfig() construction with profile files
+
+Builds a fake sysfs tree and a configuration directory holding a range
+profile ("0-N ...") and a per-CPU profile, the format older versions
+of the GUI wrote, then times loading the configuration and the profile settings,
+first parsed and then from the profile cache.
+
+Usage: python3 benchmarks/bench_profiles.py [--cpus 64,256,1024]
+           [--per-policy N]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cpupower_gui import utils  # noqa: E402
+from cpupower_gui.config import CpuPowerConfig  # noqa: E402
+from fake_sysfs import build_fake_sysfs  # noqa: E402
+
+
+def timed(func):
+    """Return the time of func in ms"""
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1e3
+
+
+def write_profiles(conf_dir, ncpus):
+    """Write a range profile and a per-CPU profile to conf_dir"""
+    (conf_dir / "range.profile").write_text(
+        "# name: Range\n0-{}\t800\t3600\tschedutil\ty\n".format(ncpus - 1)
+    )
+    lines = ["# name: Per CPU"]
+    for cpu in range(ncpus):
+        lines.append("{}\t800\t3600\tperformance\ty".format(cpu))
+    (conf_dir / "percpu.profile").write_text("\n".join(lines) + "\n")
+
+
+def run(ncpus, per_policy, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        build_fake_sysfs(tmp / "sys", cpus=ncpus, per_policy=per_policy)
+        utils.set_sysfs_root(tmp / "sys")
+        conf_dir = tmp / "conf"
+        conf_dir.mkdir()
+        write_profiles(conf_dir, ncpus)
+
+        class Config(CpuPowerConfig):
+            etc_conf = conf_dir / "none.conf"
+            etc_confd = conf_dir / "none.d"
+            user_conf = conf_dir
+            cache_file = tmp / "cache/profiles.json"
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            Config()
+        elapsed = (time.perf_counter() - start) * 1e3 / repeat
+
+        def load_settings():
+            config = Config()
+            for name in config.profiles:
+                config.get_profile_settings(name)
+            config.save_cache()
+
+        parsed = timed(load_settings)
+        cached = timed(load_settings)
+        return elapsed, parsed, cached
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--cpus", default="64,256,1024", help="comma separated CPU counts"
+    )
+    parser.add_argument("--per-policy", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for ncpus in [int(n) for n in args.cpus.split(",")]:
+        elapsed, parsed, cached = run(ncpus, args.per_policy, args.repeat)
+        print(
+            "{:>5} CPUs  CpuPowerConfig() {:>8.2f} ms  settings parsed {:>8.2f} ms"
+            "  cached {:>8.2f} ms".format(ncpus, elapsed, parsed, cached)
+        )
+
+
+if __name__ == "__main__":
+    main()
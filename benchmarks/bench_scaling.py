@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Scaling benchmark of configuration parsing, CpuSettings and refresh
+
+Runs against fake sysfs trees of increasing CPU counts, so it needs no
+cpufreq hardware.
+
+Usage: python3 benchmarks/bench_scaling.py [--cpus 16,64] [--per-policy N]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cpupower_gui import utils  # noqa: E402
+from cpupower_gui.config import CpuPowerConfig, read_cpu_settings  # noqa: E402
+from fake_sysfs import build_fake_sysfs  # noqa: E402
+
+
+def timed(func, repeat=1):
+    """Return the mean time of func in ms"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1e3 / repeat
+
+
+def refresh_tick(sampler):
+    """The sysfs work done by the window on every timer tick"""
+    utils.CpuTopologySnapshot()
+    sampler.sample()
+
+
+def run(ncpus, per_policy, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        build_fake_sysfs(tmp, cpus=ncpus, per_policy=per_policy)
+        utils.set_sysfs_root(tmp)
+        cpus = utils.cpus_available()
+
+        results = {
+            "CpuPowerConfig()": timed(CpuPowerConfig),
+            "read_cpu_settings": timed(lambda: read_cpu_settings(cpus)),
+        }
+        sampler = utils.CurrentFreqSampler(cpus)
+        results["refresh tick"] = timed(lambda: refresh_tick(sampler), repeat)
+        sampler.close()
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cpus", default="16,64", help="comma separated CPU counts")
+    parser.add_argument("--per-policy", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for ncpus in [int(n) for n in args.cpus.split(",")]:
+        results = run(ncpus, args.per_policy, args.repeat)
+        for name, elapsed in results.items():
+            print("{:>5} CPUs  {:<18} {:>10.2f} ms".format(ncpus, name, elapsed))
+
+
+if __name__ == "__main__":
+    main()
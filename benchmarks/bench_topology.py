@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Count file opens for one current frequency refresh
+
+Builds a throw-away fake sysfs tree with the requested number of CPUs and
+compares reading the current frequency of every CPU with and without
+a CpuTopologySnapshot.
+
+Usage: python3 benchmarks/bench_topology.py [--cpus N]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cpupower_gui import utils  # noqa: E402
+from fake_sysfs import build_fake_sysfs  # noqa: E402
+
+OPENS = 0
+
+
+def _audit(event, args):
+    global OPENS
+    if event == "open":
+        OPENS += 1
+
+
+def refresh(cpus, snapshot):
+    topology = utils.CpuTopologySnapshot() if snapshot else None
+    for cpu in cpus:
+        utils.read_current_freq(cpu, topology)
+
+
+def measure(cpus, snapshot):
+    global OPENS
+    OPENS = 0
+    start = time.perf_counter()
+    refresh(cpus, snapshot)
+    elapsed = time.perf_counter() - start
+    return OPENS, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cpus", type=int, default=192)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        build_fake_sysfs(tmp, cpus=args.cpus)
+        utils.set_sysfs_root(tmp)
+
+        sys.addaudithook(_audit)
+        cpus = range(args.cpus)
+        for label, snapshot in (("per-cpu is_online", False), ("snapshot", True)):
+            opens, elapsed = measure(cpus, snapshot)
+            print(
+                "{:<18} {:>6} opens/tick {:>8.2f} ms/tick".format(
+                    label, opens, elapsed * 1e3
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""Check that the helper keeps serving calls while polkit is slow to reply
+
+Starts a private D-Bus daemon, a fake org.freedesktop.PolicyKit1 authority
+that answers CheckAuthorization after a delay, and the helper against a
+fake sysfs tree. A governor change is sent first and, while it waits for
+the authority, read calls must still be answered. The change must succeed
+once the authority replies.
+
+Needs dbus-daemon, dbus-python and PyGObject. Exits with 1 on failure.
+
+Usage: python3 benchmarks/check_auth_delay.py [--delay SECONDS]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import dbus
+import dbus.service
+from dbus.bus import BusConnection
+from dbus.mainloop.glib import DBusGMainLoop
+from gi.repository import GLib
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fake_sysfs import build_fake_sysfs  # noqa: E402
+
+ROOT = Path(__file__).resolve().parents[1]
+HELPER_NAME = "org.rnd2.cpupower_gui.helper"
+HELPER_PATH = "/org/rnd2/cpupower_gui/helper"
+
+BUS_CONFIG = """<!DOCTYPE busconfig PUBLIC
+ "-//freedesktop//DTD D-Bus Bus Configuration 1.0//EN"
+ "http://www.freedesktop.org/standards/dbus/1.0/busconfig.dtd">
+<busconfig>
+  <type>session</type>
+  <listen>unix:path={socket}</listen>
+  <policy context="default">
+    <allow send_destination="*"/>
+    <allow own="*"/>
+  </policy>
+</busconfig>
+"""
+
+
+class FakeAuthority(dbus.service.Object):
+    """PolicyKit1 authority that authorizes every subject after a delay"""
+
+    def __init__(self, bus, delay):
+        self.name = dbus.service.BusName("org.freedesktop.PolicyKit1", bus=bus)
+        dbus.service.Object.__init__(
+            self, self.name, "/org/freedesktop/PolicyKit1/Authority"
+        )
+        self.delay = delay
+        self.calls = 0
+
+    @dbus.service.method(
+        "org.freedesktop.PolicyKit1.Authority",
+        out_signature="(bba{ss})",
+        async_callbacks=("reply", "error"),
+    )
+    def CheckAuthorization(self, *args, reply=None, error=None):
+        self.calls += 1
+
+        def answer():
+            reply((True, False, {}))
+            return False
+
+        GLib.timeout_add(int(self.delay * 1000), answer)
+
+
+def start_bus(tmp):
+    """Start a private dbus-daemon and return it with its address"""
+    config = tmp / "bus.conf"
+    config.write_text(BUS_CONFIG.format(socket=tmp / "bus"))
+    daemon = subprocess.Popen(
+        ["dbus-daemon", "--config-file={}".format(config), "--nofork"],
+        stdout=subprocess.DEVNULL,
+    )
+    socket = tmp / "bus"
+    for _ in range(100):
+        if socket.exists():
+            break
+        time.sleep(0.05)
+    return daemon, "unix:path={}".format(socket)
+
+
+def start_helper(tmp, address):
+    """Start the helper on the private bus with a fake sysfs tree"""
+    build_fake_sysfs(tmp / "sys", cpus=4, per_policy=2)
+    source = (ROOT / "cpupower_gui/cpupower-gui-helper.py.in").read_text()
+    helper = tmp / "cpupower-gui-helper.py"
+    helper.write_text(source.replace("@pkgdatadir@", str(ROOT)))
+    env = dict(
+        os.environ,
+        DBUS_SYSTEM_BUS_ADDRESS=address,
+        CPUPOWER_GUI_SYSFS=str(tmp / "sys"),
+    )
+    return subprocess.Popen([sys.executable, str(helper)], env=env)
+
+
+def wait_for_name(bus, name, timeout=10):
+    """Return True once name has an owner on bus"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if bus.name_has_owner(name):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def check(bus, authority, delay):
+    """Return a list of failures of the delayed authorization check"""
+    helper = dbus.Interface(
+        bus.get_object(HELPER_NAME, HELPER_PATH), dbus_interface=HELPER_NAME
+    )
+    loop = GLib.MainLoop()
+    times = {}
+    results = {}
+    failures = []
+
+    def on_reply(name):
+        def handler(*result):
+            times[name] = time.monotonic() - start
+            results[name] = result[0] if result else None
+            if name == "update":
+                loop.quit()
+
+        return handler
+
+    def on_error(name):
+        def handler(err):
+            failures.append("{} failed: {}".format(name, err))
+            loop.quit()
+
+        return handler
+
+    def read_calls():
+        helper.get_cpu_governor(
+            0, reply_handler=on_reply("governor"), error_handler=on_error("governor")
+        )
+        helper.get_cpus_online(
+            reply_handler=on_reply("online"), error_handler=on_error("online")
+        )
+        return False
+
+    start = time.monotonic()
+    helper.update_cpu_governor(
+        0,
+        "powersave",
+        reply_handler=on_reply("update"),
+        error_handler=on_error("update"),
+        timeout=delay + 30,
+    )
+    GLib.timeout_add(min(500, int(delay * 250)), read_calls)
+    GLib.timeout_add(int((delay + 30) * 1000), loop.quit)
+    loop.run()
+    if failures:
+        return failures
+
+    for name in ("governor", "online"):
+        if name not in times:
+            failures.append("no reply to {}".format(name))
+        elif times[name] >= delay:
+            failures.append(
+                "{} answered after {:.2f} s, while waiting for polkit".format(
+                    name, times[name]
+                )
+            )
+    if "update" not in times:
+        failures.append("no reply to update_cpu_governor")
+    elif times["update"] < delay:
+        failures.append("update_cpu_governor answered before polkit")
+    elif results["update"] != 0:
+        failures.append("update_cpu_governor returned {}".format(results["update"]))
+    elif helper.get_cpu_governor(0) != "powersave":
+        failures.append("governor was not written")
+    if authority.calls != 1:
+        failures.append("polkit was asked {} times".format(authority.calls))
+    for name in sorted(times):
+        print("{:>10} replied after {:.2f} s".format(name, times[name]))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--delay", type=float, default=3, help="seconds polkit takes to reply"
+    )
+    args = parser.parse_args()
+
+    DBusGMainLoop(set_as_default=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        daemon, address = start_bus(tmp)
+        helper = None
+        try:
+            bus = BusConnection(address)
+            authority = FakeAuthority(bus, args.delay)
+            helper = start_helper(tmp, address)
+            if not wait_for_name(bus, HELPER_NAME):
+                failures = ["the helper did not start"]
+            else:
+                failures = check(bus, authority, args.delay)
+        finally:
+            if helper is not None:
+                helper.terminate()
+                helper.wait()
+            daemon.terminate()
+            daemon.wait()
+
+    for failure in failures:
+        print("FAIL:", failure)
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
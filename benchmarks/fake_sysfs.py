@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Generate a synthetic sysfs tree with cpufreq attributes
+
+The tree mirrors the layout of /sys/devices/system/cpu: per policy
+attributes live in cpufreq/policyN and every online cpuN/cpufreq is a
+symlink to its policy. Point cpupower-gui at it with the
+CPUPOWER_GUI_SYSFS environment variable or utils.set_sysfs_root().
+
+Usage: python3 benchmarks/fake_sysfs.py ROOT [--cpus N] [--per-policy N]
+           [--governors G,G] [--driver NAME] [--offline LIST] [--epp]
+"""
+
+import argparse
+from pathlib import Path
+
+GOVERNORS = ("performance", "powersave", "schedutil", "ondemand", "userspace")
+EPP_PREFS = ("default", "performance", "balance_performance", "power")
+
+
+def _core_list(cpus):
+    """Format cpus like the kernel does for online/present"""
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and ranges[-1][1] == cpu - 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(
+        str(start) if start == end else "{}-{}".format(start, end)
+        for start, end in ranges
+    )
+
+
+def build_fake_sysfs(
+    root,
+    cpus=8,
+    per_policy=1,
+    governors=GOVERNORS,
+    driver="acpi-cpufreq",
+    offline=(),
+    fmin=800000,
+    fmax=3600000,
+    epp=False,
+):
+    """Create a fake sysfs tree under root
+
+    Args:
+        root: Directory to use as the sysfs root
+        cpus: Number of present CPUs
+        per_policy: Number of CPUs sharing a cpufreq policy
+        governors: Available governors, the first is the active one
+        driver: Name reported in scaling_driver
+        offline: CPUs to mark as offline
+        fmin: Hardware minimum frequency in kHz
+        fmax: Hardware maximum frequency in kHz
+        epp: Add energy performance preference attributes
+
+    Returns:
+        cpu_dir: Path of the devices/system/cpu directory
+
+    """
+    offline = set(offline)
+    cpu_dir = Path(root) / "devices/system/cpu"
+    (cpu_dir / "cpufreq").mkdir(parents=True, exist_ok=True)
+
+    all_cpus = range(cpus)
+    online = [cpu for cpu in all_cpus if cpu not in offline]
+    (cpu_dir / "present").write_text(_core_list(all_cpus) + "\n")
+    (cpu_dir / "possible").write_text(_core_list(all_cpus) + "\n")
+    (cpu_dir / "online").write_text(_core_list(online) + "\n")
+    (cpu_dir / "offline").write_text(_core_list(offline) + "\n")
+
+    step = (fmax - fmin) // 4
+    attributes = {
+        "cpuinfo_min_freq": fmin,
+        "cpuinfo_max_freq": fmax,
+        "scaling_min_freq": fmin,
+        "scaling_max_freq": fmax,
+        "scaling_cur_freq": fmin + step,
+        "scaling_driver": driver,
+        "scaling_governor": governors[0],
+        "scaling_available_governors": " ".join(governors),
+    }
+    if driver != "intel_pstate":
+        attributes["scaling_available_frequencies"] = " ".join(
+            str(freq) for freq in range(fmax, fmin - 1, -step)
+        )
+    if epp:
+        attributes["energy_performance_preference"] = EPP_PREFS[0]
+        attributes["energy_performance_available_preferences"] = " ".join(EPP_PREFS)
+
+    for first in range(0, cpus, per_policy):
+        members = range(first, min(first + per_policy, cpus))
+        affected = [cpu for cpu in members if cpu not in offline]
+        policy = cpu_dir / "cpufreq/policy{}".format(first)
+        policy.mkdir(exist_ok=True)
+        (policy / "related_cpus").write_text(" ".join(map(str, members)) + "\n")
+        (policy / "affected_cpus").write_text(" ".join(map(str, affected)) + "\n")
+        for name, value in attributes.items():
+            (policy / name).write_text("{}\n".format(value))
+
+        for cpu in members:
+            core = cpu_dir / "cpu{}".format(cpu)
+            core.mkdir(exist_ok=True)
+            # cpu0 usually cannot be taken offline
+            if cpu != 0:
+                online_file = core / "online"
+                online_file.write_text("0\n" if cpu in offline else "1\n")
+            link = core / "cpufreq"
+            if cpu not in offline and not link.is_symlink():
+                link.symlink_to(Path("../cpufreq", policy.name))
+
+    return cpu_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", help="directory to use as the sysfs root")
+    parser.add_argument("--cpus", type=int, default=8, help="number of CPUs")
+    parser.add_argument(
+        "--per-policy", type=int, default=1, help="CPUs sharing a cpufreq policy"
+    )
+    parser.add_argument(
+        "--governors",
+        default=",".join(GOVERNORS),
+        help="comma separated governors, the first is active",
+    )
+    parser.add_argument("--driver", default="acpi-cpufreq", help="scaling driver")
+    parser.add_argument(
+        "--offline", default="", help="comma separated list of offline CPUs"
+    )
+    parser.add_argument(
+        "--epp", action="store_true", help="add energy performance preferences"
+    )
+    args = parser.parse_args()
+
+    offline = [int(cpu) for cpu in args.offline.split(",") if cpu]
+    cpu_dir = build_fake_sysfs(
+        args.root,
+        cpus=args.cpus,
+        per_policy=args.per_policy,
+        governors=args.governors.split(","),
+        driver=args.driver,
+        offline=offline,
+        epp=args.epp,
+    )
+    print("Created {} CPUs under {}".format(args.cpus, cpu_dir))
+    print("Run with CPUPOWER_GUI_SYSFS={}".format(args.root))
+
+
+if __name__ == "__main__":
+    main()
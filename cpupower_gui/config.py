@@ -1,5 +1,10 @@
 """Class for reading configuration files"""
 
+import atexit
+import hashlib
+import json
+import os
+import tempfile
 from configparser import ConfigParser
 from pathlib import Path
 from shlex import split
@@ -8,21 +13,38 @@ try:
     from xdg import BaseDirectory
 
     XDG_PATH = Path(BaseDirectory.save_config_path("cpupower_gui"))
+    XDG_CACHE_HOME = Path(BaseDirectory.xdg_cache_home)
 except ImportError:
     BaseDirectory = None
     XDG_PATH = None
+    XDG_CACHE_HOME = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+
+# The boot service runs as root and keeps its cache with the system ones
+if os.geteuid() == 0:
+    CACHE_PATH = Path("/var/cache/cpupower_gui")
+else:
+    CACHE_PATH = XDG_CACHE_HOME / "cpupower_gui"
 
 from cpupower_gui.utils import (
+    CpuSet,
+    CpuTopologySnapshot,
+    SCALING_DRIVER,
+    STATIC_CACHE,
     cpus_available,
     is_energy_pref_avail,
     is_online,
     parse_core_list,
+    policy_leader,
     read_available_energy_prefs,
+    read_available_frequencies,
+    read_cpu_states,
     read_energy_pref,
     read_freq_lims,
     read_freqs,
     read_governor,
     read_govs,
+    read_per_policy,
+    read_policies,
 )
 
 
@@ -32,6 +54,7 @@ class CpuPowerConfig:
     etc_conf = Path("/etc/cpupower_gui.conf")
     etc_confd = Path("/etc/cpupower_gui.d")
     user_conf = XDG_PATH
+    cache_file = CACHE_PATH / "profiles.json"
 
     def __init__(self):
         self.config = ConfigParser()
@@ -39,6 +62,9 @@ class CpuPowerConfig:
         self.config.add_section("GUI")
         self.config.set("Profile", "profile", "Balanced")
         self._profiles = {}
+        # All profiles are parsed against the same hardware state
+        self._hw = HardwareSnapshot()
+        self._cache = ProfileCache(self.cache_file, self._hw)
         # Initialise class
         self._generate_default_profiles()
         self._read_configuration()
@@ -70,14 +96,14 @@ class CpuPowerConfig:
         if self.etc_confd.exists():
             profile_files = sorted(self.etc_confd.glob("*.profile"))
             for file in profile_files:
-                prof = Profile(file, system=True)
+                prof = Profile(file, system=True, hw=self._hw, cache=self._cache)
                 self._profiles.update({prof.name: prof})
 
         # user configuration
         if self.user_conf:
             profile_files = sorted(self.user_conf.glob("*.profile"))
             for file in profile_files:
-                prof = Profile(file)
+                prof = Profile(file, hw=self._hw, cache=self._cache)
                 self._profiles.update({prof.name: prof})
 
     @property
@@ -150,6 +176,13 @@ class CpuPowerConfig:
         profile.write_file()
         self._profiles[name] = profile
 
+    def save_cache(self):
+        """Write the settings of the profiles parsed so far to the cache
+
+        The cache is also written at exit, this writes it earlier.
+        """
+        self._cache.save()
+
     def get_profile_settings(self, name):
         """Returns profile settings
 
@@ -211,38 +244,355 @@ class CpuPowerConfig:
 
         # generate balanced profile based on schedutil/ondemand/powersave governor
         if "schedutil" in govs:
-            self._profiles["Balanced"] = DefaultProfile("Balanced", "schedutil")
+            self._profiles["Balanced"] = DefaultProfile(
+                "Balanced", "schedutil", hw=self._hw, cache=self._cache
+            )
         elif "ondemand" in govs:
-            self._profiles["Balanced"] = DefaultProfile("Balanced", "ondemand")
+            self._profiles["Balanced"] = DefaultProfile(
+                "Balanced", "ondemand", hw=self._hw, cache=self._cache
+            )
         elif "powersave" in govs:
-            self._profiles["Balanced"] = DefaultProfile("Balanced", "powersave")
+            self._profiles["Balanced"] = DefaultProfile(
+                "Balanced", "powersave", hw=self._hw, cache=self._cache
+            )
 
         # The governor 'userspace' does not do anything by itself. Instead, it allows user space to set the CPU
         # frequency for the policy it is attached to by writing to the scaling_setspeed attribute of that policy.
         # Notes: intel_pstate will not use generic scaling governors as usual.
         for gov in govs:
             if gov != "userspace":
-                self._profiles[gov.title()] = DefaultProfile(gov.title(), gov)
+                self._profiles[gov.title()] = DefaultProfile(
+                    gov.title(), gov, hw=self._hw, cache=self._cache
+                )
+
+
+class HardwareSnapshot:
+    """The hardware state profiles are parsed against
+
+    The cpufreq capable CPUs, the topology and the policies are read once,
+    on first use, so that listing profiles does not touch sysfs. Frequency
+    limits and governors are read once per policy.
+
+    Args:
+        topology: Optional CpuTopologySnapshot to use
+        policies: Optional dict from read_policies() to use
+
+    """
+
+    def __init__(self, topology=None, policies=None):
+        self._topology = topology
+        self._policies = policies
+        self._available = None
+        self._lims = {}
+        self._governors = {}
+        self._leaders = {}
+        self._fingerprint = None
+
+    @property
+    def topology(self):
+        if self._topology is None:
+            self._topology = CpuTopologySnapshot()
+        return self._topology
+
+    @property
+    def policies(self):
+        if self._policies is None:
+            self._policies = read_policies()
+        return self._policies
+
+    @property
+    def available(self):
+        """CpuSet of present CPUs with cpufreq support"""
+        if self._available is None:
+            self._available = cpus_available()
+        return self._available
+
+    def leader(self, cpu):
+        """Returns the cpu whose attributes cpu shares"""
+        leader = self._leaders.get(cpu)
+        if leader is None:
+            leader = self._leaders[cpu] = policy_leader(cpu, self.policies)
+        return leader
+
+    def freq_lims(self, cpu):
+        """Returns the hardware frequency limits of cpu"""
+        leader = self.leader(cpu)
+        if leader not in self._lims:
+            self._lims[leader] = read_freq_lims(leader, self.topology)
+        return self._lims[leader]
+
+    def governors(self, cpu):
+        """Returns the available governors of cpu"""
+        leader = self.leader(cpu)
+        if leader not in self._governors:
+            self._governors[leader] = read_govs(leader)
+        return self._governors[leader]
+
+    @property
+    def fingerprint(self):
+        """Digest of the hardware state parsed profiles depend on
+
+        Covers the cpufreq capable and online CPUs, the scaling driver and
+        the governors and hardware limits of every policy.
+        """
+        if self._fingerprint is None:
+            available = self.available
+            driver = ""
+            for cpu in available:
+                try:
+                    driver = STATIC_CACHE.read(cpu, SCALING_DRIVER)
+                except OSError:
+                    pass
+                break
+
+            leaders = sorted({self.leader(cpu) for cpu in available})
+            state = {
+                "available": str(available),
+                "online": str(self.topology.online),
+                "driver": driver,
+                "policies": [
+                    [leader, self.freq_lims(leader), self.governors(leader)]
+                    for leader in leaders
+                ],
+            }
+            text = json.dumps(state, sort_keys=True)
+            self._fingerprint = hashlib.sha256(text.encode()).hexdigest()
+        return self._fingerprint
+
+
+class ProfileCache:
+    """Compiled profile settings stored as JSON
+
+    An entry holds the settings of a profile with the mtime and size of
+    its .profile file, if it has one. It is used only while the file is
+    unchanged, and the whole cache is dropped when the hardware
+    fingerprint differs from the one it was written with.
+
+    Stored entries are written by save, once at exit unless it is called
+    earlier.
+
+    Args:
+        path: The JSON file, it is created on the first save
+        hw: HardwareSnapshot whose fingerprint keys the cache
+
+    """
+
+    def __init__(self, path, hw):
+        self.path = Path(path)
+        self.hw = hw
+        self._entries = None
+        self._dirty = False
+        self._at_exit = False
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+
+        self._entries = {}
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return self._entries
+
+        if isinstance(data, dict) and data.get("fingerprint") == self.hw.fingerprint:
+            profiles = data.get("profiles")
+            if isinstance(profiles, dict):
+                self._entries = profiles
+        return self._entries
+
+    @staticmethod
+    def _stamp(file):
+        """Returns the mtime and size of file, zeros without one"""
+        if file is None:
+            return 0, 0
+        stat = file.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, key, file=None):
+        """Returns the cached settings of a profile or None
+
+        Args:
+            key: Name of the entry
+            file: Optional path of the .profile file the entry is read from
+
+        """
+        try:
+            mtime, size = self._stamp(file)
+        except OSError:
+            return None
+
+        # A damaged or outdated entry is a miss, the profile is parsed again
+        try:
+            entry = self._load().get(key)
+            if not entry or entry["mtime"] != mtime or entry["size"] != size:
+                return None
+
+            return {
+                parse_core_list(cpus): {
+                    "freqs": (fmin, fmax),
+                    "governor": governor,
+                    "online": online,
+                }
+                for cpus, fmin, fmax, governor, online in entry["groups"]
+            }
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return None
+
+    def put(self, key, groups, file=None):
+        """Store the settings of a profile
+
+        Args:
+            key: Name of the entry
+            groups: Grouped settings of the profile, see Profile.groups
+            file: Optional path of the .profile file the entry is read from
+
+        """
+        try:
+            mtime, size = self._stamp(file)
+        except OSError:
+            return
+
+        self._load()[key] = {
+            "mtime": mtime,
+            "size": size,
+            "groups": [
+                [str(cpus), *conf["freqs"], conf["governor"], conf["online"]]
+                for cpus, conf in groups.items()
+            ],
+        }
+        self._dirty = True
+        if not self._at_exit:
+            atexit.register(self.save)
+            self._at_exit = True
+
+    def save(self):
+        """Write the cache if entries were stored since the last save"""
+        if not self._dirty:
+            return
+
+        self._dirty = False
+        data = {"fingerprint": self.hw.fingerprint, "profiles": self._entries}
+        tmp = None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Each writer has its own temporary file, replaced in one step,
+            # so processes do not mix their writes and readers never see
+            # half of the file
+            with tempfile.NamedTemporaryFile(
+                "w", dir=self.path.parent, suffix=".tmp", delete=False
+            ) as tmp:
+                json.dump(data, tmp)
+            os.replace(tmp.name, self.path)
+        except OSError:
+            # Not writable, profiles are parsed every time
+            if tmp is not None:
+                try:
+                    os.unlink(tmp.name)
+                except OSError:
+                    pass
 
 
 class Profile:
-    """Wrapper for .profile files"""
+    """Wrapper for .profile files
+
+    The settings are kept grouped, as a dict mapping each CpuSet to the
+    settings its cpus share. Only the name is read when the profile is
+    created, the settings are parsed on first access.
+    """
 
-    def __init__(self, filename=None, system=False):
+    def __init__(self, filename=None, system=False, hw=None, cache=None):
         self._custom = True
         self.system = system
-        self.settings = {}
+        self._groups = None
+        self._settings = None
+        self._hw = hw
+        self._cache = cache
         self.name = ""
         self.file = None
         if filename:
             self.file = Path(filename)
-            self.parse_file()
+            self._read_name()
+
+    @property
+    def groups(self):
+        """Dict mapping a CpuSet to its settings, parsed on first access"""
+        if self._groups is None:
+            self._groups = {}
+            self._load_settings()
+        return self._groups
+
+    @groups.setter
+    def groups(self, groups):
+        self._groups = groups
+        self._settings = None
+
+    @property
+    def settings(self):
+        """Per-CPU settings dict
+
+        Each cpu has its own copy of the settings of its group, assign
+        settings or groups to change the profile.
+        """
+        if self._settings is None:
+            settings = {}
+            for cpus, conf in self.groups.items():
+                settings.update((cpu, dict(conf)) for cpu in cpus)
+            self._settings = dict(sorted(settings.items()))
+        return self._settings
+
+    @settings.setter
+    def settings(self, settings):
+        self.groups = group_settings(settings)
+
+    @property
+    def _cache_key(self):
+        """Name of the cache entry, None for a profile without a file"""
+        if self.file is None:
+            return None
+        return str(self.file.resolve())
+
+    def _load_settings(self):
+        """Fill the settings from the cache or the profile file"""
+        key = self._cache_key if self._cache is not None else None
+        if key is not None:
+            groups = self._cache.get(key, self.file)
+            if groups is not None:
+                self.groups = groups
+                return
+
+        self._compile()
+        if key is not None:
+            self._cache.put(key, self._groups, self.file)
+
+    def _compile(self):
+        """Parse the profile file"""
+        if self.file is not None:
+            self.parse_file(self._hw)
+
+    def _read_name(self):
+        """Read the profile name from the first line of the file"""
+        if not self.file.exists():
+            return
+
+        with self.file.open() as f:
+            first = f.readline()
+        if "name:" in first:
+            self.name = split(first)[-1]
+        else:
+            self.name = self.file.name
 
-    def parse_file(self):
-        """Parse .profile file"""
+    def parse_file(self, hw=None):
+        """Parse .profile file
+
+        Args:
+            hw: Optional HardwareSnapshot to parse against
+
+        """
         if not self.file.exists():
             return
 
+        if hw is None:
+            hw = HardwareSnapshot()
         text = self.file.read_text().splitlines()
         # read name
         if "name:" in text[0]:
@@ -250,10 +600,13 @@ class Profile:
         else:
             self.name = self.file.name
 
+        # Later lines override the cpus of earlier ones
+        groups = {}
         for line in text[1:]:
             vals = split(line, comments=True)
             if vals:
-                self.settings.update(self._read_values(*vals))
+                groups = merge_groups(groups, self._read_values(*vals, hw=hw))
+        self.groups = groups
 
     def delete_file(self):
         """Delete profile file"""
@@ -261,13 +614,14 @@ class Profile:
             self.file.unlink(missing_ok=True)
 
     def parse_settings(self, settings):
+        configs = {}
         for core, conf in settings.items():
-            config = {
+            configs[core] = {
                 "freqs": conf.freqs_scaled,
                 "governor": conf.governor,
                 "online": conf.online,
             }
-            self.settings[core] = config
+        self.groups = merge_groups(self.groups, group_settings(configs))
 
     def write_file(self):
         if self.file:
@@ -277,20 +631,24 @@ class Profile:
     def _format_settings(self):
         body = "# name: {}\n\n".format(self.name)
         body += "# CPU\tMin\tMax\tGovernor\tOnline\n"
-        for core, conf in self.settings.items():
+        # One line per group of cpus, e.g. 0-127 800 3600 schedutil y
+        groups = sorted(self.groups.items(), key=lambda group: min(group[0]))
+        for cpus, conf in groups:
             fmin, fmax = conf["freqs"]
             gov = conf["governor"]
-            online = conf["online"]
+            online = "y" if conf["online"] else "n"
             line = "{}\t{}\t{}\t{}\t{}\n".format(
-                core, int(fmin / 1e3), int(fmax / 1e3), gov, online
+                cpus, int(fmin / 1e3), int(fmax / 1e3), gov, online
             )
             body += line
 
         return body
 
     @staticmethod
-    def _read_values(cpus: str, fmin: str, fmax: str, governor: str, online="y"):
-        """Return settings dict from parsed settings
+    def _read_values(
+        cpus: str, fmin: str, fmax: str, governor: str, online="y", *, hw=None
+    ):
+        """Return grouped settings from parsed settings
 
         Args:
             cpus: String with related cores
@@ -298,49 +656,73 @@ class Profile:
             fmax: Maximum core frequency
             governor: Core governor
             online: If core is online or offline
+            hw: Optional HardwareSnapshot to parse against
 
         Returns:
-            settings (dict): Dictionary with parsed settings
+            groups (dict): Dictionary mapping a CpuSet to parsed settings
 
         """
-        settings = {}
+        groups = {}
+        if hw is None:
+            hw = HardwareSnapshot()
         # cpu, fmin, fmax, gov
         cores = parse_core_list(cpus)
+        on = parse_online(None, online, hw)
+        # Frequencies and governor are parsed once per cpufreq policy
+        shared = {}
         for core in cores:
             # Skip core if not available
-            if core not in cpus_available():
+            if core not in hw.available:
                 continue
 
-            conf = {
-                "freqs": parse_freqs(core, fmin, fmax),
-                "governor": parse_governor(core, governor),
-                "online": parse_online(core, online),
-            }
-            settings.update({core: conf})
-        return settings
+            leader = hw.leader(core)
+            if leader not in shared:
+                shared[leader] = (
+                    parse_freqs(leader, fmin, fmax, hw),
+                    parse_governor(leader, governor, hw),
+                )
+            groups.setdefault(shared[leader], []).append(core)
+
+        return {
+            CpuSet(cores): {"freqs": freqs, "governor": gov, "online": on}
+            for (freqs, gov), cores in groups.items()
+        }
 
 
 class DefaultProfile(Profile):
     """Class for the default profiles"""
 
-    def __init__(self, name: str, governor="-", fmin="-", fmax="-"):
-        super().__init__()
+    def __init__(
+        self, name: str, governor="-", fmin="-", fmax="-", hw=None, cache=None
+    ):
+        super().__init__(hw=hw, cache=cache)
         self._custom = False
         self.name = name
-        self._generate_profile(fmin, fmax, governor)
+        self._values = (fmin, fmax, governor)
+
+    @property
+    def _cache_key(self):
+        return "default:{}:{}:{}".format(*self._values)
+
+    def _compile(self):
+        """Generate the settings from the hardware"""
+        self._generate_profile(*self._values, self._hw)
 
-    def _generate_profile(self, fmin: str, fmax: str, governor: str):
+    def _generate_profile(self, fmin: str, fmax: str, governor: str, hw=None):
         """Generate default settings
 
         Args:
             fmin: Minimum core frequency
             fmax: Maximum core frequency
             governor: Core governor
+            hw: Optional HardwareSnapshot to parse against
 
         """
-        for core in cpus_available():
-            conf = self._read_values(str(core), fmin, fmax, governor)
-            self.settings.update(conf)
+        if hw is None:
+            hw = HardwareSnapshot()
+        cores = hw.available
+        if cores:
+            self.groups = self._read_values(str(cores), fmin, fmax, governor, hw=hw)
 
 
 #
@@ -348,52 +730,107 @@ class DefaultProfile(Profile):
 #
 
 
-def parse_freqs(cpu: int, fmin: str, fmax: str):
+def _settings_key(conf):
+    return tuple(conf["freqs"]), conf["governor"], conf["online"]
+
+
+def group_settings(settings):
+    """Group cpus with identical settings
+
+    Args:
+        settings: Dict mapping cpu to a dict with 'freqs', 'governor' and
+            'online' keys
+
+    Returns:
+        groups: Dict mapping a CpuSet to the settings its cpus share
+
+    """
+    groups = {}
+    for cpu, conf in settings.items():
+        groups.setdefault(_settings_key(conf), (conf, []))[1].append(cpu)
+    return {CpuSet(cpus): conf for conf, cpus in groups.values()}
+
+
+def merge_groups(groups, update):
+    """Return groups with the cpus in update set to its settings
+
+    Groups left with the same settings are merged into one.
+
+    Args:
+        groups: Dict mapping a CpuSet to settings
+        update: Dict mapping a CpuSet to settings that take precedence
+
+    Returns:
+        groups: The merged dict
+
+    """
+    covered = CpuSet()
+    for cpus in update:
+        covered = covered | cpus
+
+    merged = {}
+    kept = [(cpus - covered, conf) for cpus, conf in groups.items()]
+    for cpus, conf in kept + list(update.items()):
+        if not cpus:
+            continue
+        key = _settings_key(conf)
+        if key in merged:
+            cpus = merged[key][0] | cpus
+            conf = merged[key][1]
+        merged[key] = (cpus, conf)
+    return dict(merged.values())
+
+
+def parse_freqs(cpu: int, fmin: str, fmax: str, hw=None):
     """Return valid fmin, fmax for cpu from config
 
     Args:
         cpu: The cpu to check as an integer
         fmin: The minimum frequency
         fmax: The maximum frequency
+        hw: Optional HardwareSnapshot to check against
 
     Returns:
         fmin, fmax: A tuple with the frequencies
 
     """
+    if hw is None:
+        hw = HardwareSnapshot()
     freq_min, freq_max = None, None
-    if cpu not in cpus_available():
+    if cpu not in hw.available:
         return freq_min, freq_max
 
     if fmin.isnumeric():
         freq_min = int(fmin) * 1000
     else:
-        fmin, _ = read_freq_lims(cpu)
-        freq_min = fmin
+        freq_min, _ = hw.freq_lims(cpu)
 
     if fmax.isnumeric():
         freq_max = int(fmax) * 1000
     else:
-        _, fmax = read_freq_lims(cpu)
-        freq_max = fmax
+        _, freq_max = hw.freq_lims(cpu)
 
     return freq_min, freq_max
 
 
-def parse_governor(cpu: int, gov: str):
+def parse_governor(cpu: int, gov: str, hw=None):
     """Return valid governor for cpu from config
 
     Args:
         cpu: The cpu to check as an integer
         gov: The governor value from config
+        hw: Optional HardwareSnapshot to check against
 
     Returns:
         governor: A valid governor
 
     """
-    if cpu not in cpus_available():
+    if hw is None:
+        hw = HardwareSnapshot()
+    if cpu not in hw.available:
         return None
 
-    governors = read_govs(cpu)
+    governors = hw.governors(cpu)
     if not governors:
         return None
 
@@ -403,19 +840,23 @@ def parse_governor(cpu: int, gov: str):
     return governors[0]
 
 
-def parse_online(cpu: int, online: str):
+def parse_online(cpu: int, online: str, hw=None):
     """Return valid online attribute for cpu from config
 
     Args:
-        cpu: The cpu to check as an integer
+        cpu: The cpu to check as an integer, None to skip the check
         online: The online value from config
+        hw: Optional HardwareSnapshot to check against
 
     Returns:
         online: A valid online attribute value
 
     """
-    if cpu not in cpus_available():
-        return None
+    if cpu is not None:
+        if hw is None:
+            hw = HardwareSnapshot()
+        if cpu not in hw.available:
+            return None
 
     if online.lower() in ["yes", "y", "1", "true"]:
         return True
@@ -423,6 +864,54 @@ def parse_online(cpu: int, online: str):
     return False
 
 
+def diff_settings(groups, states):
+    """Return the changes that bring the cpus from states to the settings
+
+    Frequencies and governor are compared only for cpus that stay or come
+    online, and settings without a value are left as they are.
+
+    Args:
+        groups: Profile settings, dict mapping a CpuSet to a dict with
+            'freqs', 'governor' and 'online' keys, see Profile.groups
+        states: Dict from read_cpu_states() with the current state of the cpus
+
+    Returns:
+        plan: Dict mapping each cpu that needs a change to a dict of
+            attribute to (current, wanted) for the attributes that differ
+
+    """
+    plan = {}
+    for cpus, conf in groups.items():
+        freqs = conf.get("freqs")
+        if freqs and all(freqs):
+            freqs = tuple(freqs)
+        else:
+            freqs = None
+        governor = conf.get("governor")
+
+        for cpu in cpus:
+            state = states.get(cpu)
+            if state is None:
+                continue
+
+            changes = {}
+            online = conf.get("online")
+            if online is None:
+                online = state["online"]
+            if online != state["online"]:
+                changes["online"] = (state["online"], online)
+
+            if online:
+                if freqs and freqs != tuple(state["freqs"]):
+                    changes["freqs"] = (tuple(state["freqs"]), freqs)
+                if governor and governor != state["governor"]:
+                    changes["governor"] = (state["governor"], governor)
+
+            if changes:
+                plan[cpu] = changes
+    return plan
+
+
 class CpuSettings:
     """Abstraction class for cpu settings"""
 
@@ -431,30 +920,66 @@ class CpuSettings:
         "ghz": 1e6,
     }
 
-    def __init__(self, cpu):
+    def __init__(
+        self,
+        cpu,
+        topology=None,
+        lims=None,
+        governors=None,
+        frequencies=None,
+        state=None,
+    ):
         self.cpu = cpu
         self._factor = self.units["mhz"]
         self._settings = {}
         self._new_settings = {}
+        if topology is None:
+            topology = CpuTopologySnapshot()
         # Attributes that don't change
-        self._lims = read_freq_lims(cpu)
-        self._governors = read_govs(cpu)
+        if lims is None:
+            lims = read_freq_lims(cpu, topology)
+        if governors is None:
+            governors = read_govs(cpu)
+        if frequencies is None:
+            frequencies = read_available_frequencies(cpu)
+        self._lims = lims
+        self._governors = governors
+        self._frequencies = frequencies
         self.energy_pref_avail = is_energy_pref_avail(cpu)
         self.energy_prefs = []
-        self.update_conf()
+        self.update_conf(topology, state)
+
+    def update_conf(self, topology=None, state=None):
+        """Read the current settings
+
+        Args:
+            topology: Optional CpuTopologySnapshot to use
+            state: Optional dict from read_cpu_states() to use instead
+                of reading sysfs
 
-    def update_conf(self):
+        """
         cpu = self.cpu
-        self._settings["freqs"] = read_freqs(cpu)
-        self._settings["governor"] = read_governor(cpu)
-        self._settings["online"] = is_online(cpu)
-        # In case a new governor has been added
+        if state is None:
+            if topology is None:
+                topology = CpuTopologySnapshot()
+            state = {
+                "freqs": read_freqs(cpu, topology),
+                "governor": read_governor(cpu, topology),
+                "online": is_online(cpu, topology),
+            }
+            if self.energy_pref_avail:
+                state["energy_pref"] = read_energy_pref(cpu)
+
+        self._settings["freqs"] = state["freqs"]
+        self._settings["governor"] = state["governor"]
+        self._settings["online"] = state["online"]
+        # Cached until the cpu goes on/offline or the driver changes
         self._governors = read_govs(cpu)
         # If energy performance preferences are available
         self._settings["energy_pref"] = None
 
         if self.energy_pref_avail:
-            self._settings["energy_pref"] = read_energy_pref(cpu)
+            self._settings["energy_pref"] = state["energy_pref"]
             self.energy_prefs = read_available_energy_prefs(cpu)
 
         self.reset_conf()
@@ -546,6 +1071,12 @@ class CpuSettings:
             return None
         return self._governors.index(self.governor)
 
+    @property
+    def frequencies(self):
+        """Available frequency steps in the selected units"""
+        f = self._factor
+        return [int(freq) / f for freq in self._frequencies]
+
     @property
     def hw_lims(self):
         freqs = self._lims
@@ -565,3 +1096,36 @@ class CpuSettings:
         if unit not in self.units.keys():
             return
         self._factor = self.units[unit]
+
+
+def read_cpu_settings(cpus, topology=None, parallel=None):
+    """Create CpuSettings for cpus reading each cpufreq policy once
+
+    The static attributes are read per policy and the current settings
+    with one batched read.
+
+    Args:
+        cpus: Iterable of cpus to read
+        topology: Optional CpuTopologySnapshot to use
+        parallel: Run the batched read on a thread pool, see read_attributes()
+
+    Returns:
+        settings: Dict mapping each cpu to its CpuSettings
+
+    """
+    cpus = list(cpus)
+    if topology is None:
+        topology = CpuTopologySnapshot()
+
+    policies = read_policies()
+    lims = read_per_policy(read_freq_lims, cpus, topology, policies=policies)
+    governors = read_per_policy(read_govs, cpus, policies=policies)
+    frequencies = read_per_policy(read_available_frequencies, cpus, policies=policies)
+    states = read_cpu_states(cpus, topology, policies, parallel)
+
+    settings = {}
+    for cpu in cpus:
+        settings[cpu] = CpuSettings(
+            cpu, topology, lims[cpu], governors[cpu], frequencies[cpu], states[cpu]
+        )
+    return settings
@@ -1,65 +1,254 @@
 """Module for dbus helper"""
 
 import dbus
+from dbus.mainloop.glib import DBusGMainLoop
 
+from .config import diff_settings
 from .utils import (
+    CpuSet,
+    CpuTopologySnapshot,
     cpus_available,
     read_available_energy_prefs,
     read_govs,
     is_online,
-    read_governor,
     read_freq_lims,
+    read_cpu_states,
     read_freqs,
+    read_per_policy,
+    read_policies,
 )
 
+# Needed to receive the FrequencySample and CpuStateChanged signals
+DBusGMainLoop(set_as_default=True)
 BUS = dbus.SystemBus()
+# Follow the helper across restarts, it exits when idle
 SESSION = BUS.get_object(
-    "org.rnd2.cpupower_gui.helper", "/org/rnd2/cpupower_gui/helper"
+    "org.rnd2.cpupower_gui.helper",
+    "/org/rnd2/cpupower_gui/helper",
+    follow_name_owner_changes=True,
 )
 
 HELPER = dbus.Interface(SESSION, "org.rnd2.cpupower_gui.helper")
 
+# Result of apply_cpu_settings for cpus of one policy with different settings
+POLICY_CONFLICT = -14
+
+# Seconds the helper waits for polkit, the user may be typing a password
+AUTH_TIMEOUT = 300
+# Reply timeout of calls that may wait for polkit
+CALL_TIMEOUT = AUTH_TIMEOUT + 10
+
 MSG = """Setting CPU: {}
     Minimum Frequency: {} MHz, Maximum Frequency: {} MHz
     Governor: {}, Online: {}
 """
 
 
-def apply_cpu_profile(profile):
-    """Set cpu settings base on a profile
+def _settings_request(settings):
+    # None, like 0 and "", leaves the setting unchanged
+    request = {}
+    for cpu, (fmin, fmax, gov, online, pref) in settings.items():
+        request[int(cpu)] = (
+            int(fmin or 0),
+            int(fmax or 0),
+            gov or "",
+            bool(online),
+            pref or "",
+        )
+    return dbus.Dictionary(request, signature="i(iisbs)")
+
+
+def apply_cpu_settings(settings):
+    """Apply the settings of many CPUs with a single helper call
+
+    Args:
+        settings: Dict mapping cpu to (fmin, fmax, governor, online, pref).
+            Frequencies of 0 or None and empty strings or None leave the
+            setting unchanged.
+
+    Returns:
+        results: Dict mapping cpu to the result code of the helper, 0 on
+            success
+
+    """
+    results = HELPER.apply_cpu_settings(
+        _settings_request(settings), timeout=CALL_TIMEOUT
+    )
+    return {int(cpu): int(ret) for cpu, ret in results.items()}
+
+
+def apply_cpu_settings_transaction(settings, timeout=0):
+    """Apply settings and let the helper undo them if anything fails
+
+    Args:
+        settings: Same as apply_cpu_settings()
+        timeout: Seconds before the helper undoes the settings unless
+            confirm_transaction() is called, 0 to keep them at once
+
+    Returns:
+        transaction: Id to confirm or roll back, 0 if nothing is pending
+        results: Same as apply_cpu_settings()
+        journal: List of (cpu, attribute, old, new) of the writes made
+
+    """
+    request = _settings_request(settings)
+    transaction, results, journal = HELPER.apply_cpu_settings_transaction(
+        request, dbus.UInt32(timeout), timeout=CALL_TIMEOUT
+    )
+    results = {int(cpu): int(ret) for cpu, ret in results.items()}
+    journal = [
+        (int(cpu), str(attr), str(old), str(new)) for cpu, attr, old, new in journal
+    ]
+    return int(transaction), results, journal
+
+
+def confirm_transaction(transaction):
+    """Keep the settings of a transaction, returns -1 if it already expired"""
+    return int(HELPER.confirm_transaction(dbus.UInt32(transaction)))
+
+
+def rollback_transaction(transaction):
+    """Undo a transaction, returns the number of writes that failed to undo"""
+    return int(HELPER.rollback_transaction(dbus.UInt32(transaction)))
+
+
+def plan_cpu_profile(profile):
+    """Return the changes applying a profile would make
 
     Args:
         profile: A cpupower profile
 
+    Returns:
+        plan: Dict mapping each cpu that differs from the profile to a dict
+            of attribute to (current, wanted), see config.diff_settings()
+
+    """
+    groups = profile.groups
+    cpus = CpuSet()
+    for group in groups:
+        cpus = cpus | group
+    return diff_settings(groups, read_cpu_states(cpus))
+
+
+def _profile_request(profile, plan):
+    """Return the apply_cpu_settings request that carries out a plan
+
+    The helper writes the cpus of a policy together and refuses a policy
+    whose cpus ask for different values. A cpu that already matches the
+    profile is not in the plan, so each cpu of the profile that shares a
+    policy with a changed cpu sends its wanted settings too.
+
+    Args:
+        profile: A cpupower profile
+        plan: Dict returned by plan_cpu_profile()
+
+    Returns:
+        request: Dict mapping cpu to (fmin, fmax, governor, online, pref)
+
     """
     settings = profile.settings
-    if not HELPER.isauthorized():
+    policies = read_policies()
+    topology = CpuTopologySnapshot()
+
+    cpus = set()
+    for cpu in plan:
+        policy = policies.get(cpu)
+        cpus.update(policy.related_cpus if policy is not None else [cpu])
+
+    request = {}
+    for cpu in sorted(cpus & set(settings) & set(topology.present)):
+        conf = settings[cpu]
+        freqs = conf.get("freqs")
+        fmin, fmax = freqs if freqs and all(freqs) else (0, 0)
+        if "online" in plan.get(cpu, {}):
+            _, online = plan[cpu]["online"]
+        else:
+            online = topology.is_online(cpu)
+        request[cpu] = (fmin, fmax, conf.get("governor") or "", online, "")
+    return request
+
+
+def _format_change(attribute, current, wanted):
+    if attribute == "freqs":
+        return "Frequency: {}-{} MHz -> {}-{} MHz".format(
+            *(int(freq / 1e3) for freq in (*current, *wanted))
+        )
+    if attribute == "governor":
+        return "Governor: {} -> {}".format(current.capitalize(), wanted.capitalize())
+    return "Online: {} -> {}".format(current, wanted)
+
+
+def print_profile_diff(plan):
+    """Display the changes of a plan, grouping cpus with the same changes
+
+    Args:
+        plan: Dict returned by plan_cpu_profile()
+
+    """
+    if not plan:
+        print("The CPUs already match the profile.")
+        return
+
+    groups = {}
+    for cpu, changes in plan.items():
+        key = tuple(sorted(changes.items()))
+        groups.setdefault(key, []).append(cpu)
+
+    for changes, cpus in groups.items():
+        label = "CPU" if len(cpus) == 1 else "CPUs"
+        print("{} {}:".format(label, CpuSet(cpus)))
+        for attribute, (current, wanted) in changes:
+            print("    " + _format_change(attribute, current, wanted))
+
+
+def apply_cpu_profile(profile, confirm=0):
+    """Set cpu settings base on a profile
+
+    Only the policies with cpus that differ from the profile are written,
+    and the helper skips values that are already set. The settings are
+    undone if any of them fails.
+
+    Args:
+        profile: A cpupower profile
+        confirm: Seconds to ask the user to keep the settings, 0 to keep
+            them without asking
+
+    """
+    if not HELPER.isauthorized(timeout=CALL_TIMEOUT):
         print("User is not authorised. No changes applied.")
         return -1
 
-    for cpu in settings.keys():
-        online = settings[cpu].get("online")
-        fmin = 0
-        fmax = 0
-        gov = settings[cpu].get("governor")
+    plan = plan_cpu_profile(profile)
+    if not plan:
+        print("The CPUs already match the profile.")
+        return 0
+
+    request = _profile_request(profile, plan)
+    transaction, results, _ = apply_cpu_settings_transaction(request, confirm)
+    failed = any(results.values())
+
+    for cpu in request:
+        ret = results.get(cpu, -1)
+        if ret == POLICY_CONFLICT:
+            print("CPU {} shares its policy with CPUs set differently.".format(cpu))
+        elif ret != 0:
+            print("Failed to apply settings to CPU {}.".format(cpu))
 
-        if online is not None:
-            if HELPER.cpu_allowed_offline(cpu):
-                if online:
-                    HELPER.set_cpu_online(cpu)
-                else:
-                    HELPER.set_cpu_offline(cpu)
+    if failed:
+        print("Applying the profile failed, no changes were kept.")
+        return -1
 
-        if online:
-            fmin, fmax = settings[cpu].get("freqs")
-            if fmin and fmax:
-                HELPER.update_cpu_settings(cpu, fmin, fmax)
+    print_profile_diff(plan)
 
-            if gov:
-                HELPER.update_cpu_governor(cpu, gov)
+    if transaction:
+        answer = input("Keep these settings? [y/N] ")
+        if answer.strip().lower() in ("y", "yes"):
+            if confirm_transaction(transaction) < 0:
+                print("Too late, the settings were already restored.")
+        else:
+            rollback_transaction(transaction)
+            print("The previous settings were restored.")
 
-        gov = read_governor(cpu)  # Refetch this to workaround bug
-        print(MSG.format(cpu, fmin / 1e3, fmax / 1e3, gov.capitalize(), online))
 
 def print_cpu_profile(profile):
     """Display cpu settings for profile
@@ -68,13 +257,14 @@ def print_cpu_profile(profile):
         profile: A cpupower profile
 
     """
-    settings = profile.settings
+    groups = sorted(profile.groups.items(), key=lambda group: min(group[0]))
+
+    for cpus, conf in groups:
+        fmin, fmax = conf.get("freqs")
+        gov = conf.get("governor")
+        online = conf.get("online")
+        print(MSG.format(cpus, fmin / 1e3, fmax / 1e3, gov.capitalize(), online))
 
-    for cpu in settings.keys():
-        fmin, fmax = settings[cpu].get("freqs")
-        gov = settings[cpu].get("governor")
-        online = settings[cpu].get("online")
-        print(MSG.format(cpu, fmin / 1e3, fmax / 1e3, gov.capitalize(), online))
 
 def apply_configuration(config):
     """Set cpu settings base on configuration
@@ -91,34 +281,53 @@ def apply_configuration(config):
     apply_cpu_profile(config.get_profile(profile))
 
 
+def _apply_governors(governors):
+    """Set the governor of each cpu in one helper call
+
+    Args:
+        governors: Dict mapping cpu to governor
+
+    """
+    topology = CpuTopologySnapshot()
+    request = {
+        cpu: (0, 0, gov, topology.is_online(cpu), "") for cpu, gov in governors.items()
+    }
+    results = apply_cpu_settings(request)
+    for cpu, gov in governors.items():
+        if results.get(cpu) == 0 and topology.is_online(cpu):
+            print("Set CPU {} to {}".format(cpu, gov))
+
+
 def apply_performance():
     """Set CPU governor to performance"""
-    if not HELPER.isauthorized():
+    if not HELPER.isauthorized(timeout=CALL_TIMEOUT):
         print("User is not authorised. No changes applied.")
         return -1
 
+    governors = {}
     for cpu in cpus_available():
         gov = "performance"
         if gov not in read_govs(cpu):
             gov = "schedutil"
             if gov not in read_govs(cpu):
                 print("Failed to set governor to performance")
+                continue
+        governors[cpu] = gov
 
-        ret = HELPER.update_cpu_governor(cpu, gov)
-        if ret == 0:
-            print("Set CPU {} to {}".format(cpu, gov))
-
+    _apply_governors(governors)
     return 0
 
 
 def apply_balanced():
     """Set CPU governor to schedutil/ondemand/powersave"""
-    if not HELPER.isauthorized():
+    if not HELPER.isauthorized(timeout=CALL_TIMEOUT):
         print("User is not authorised. No changes applied.")
         return -1
 
+    governors = {}
     for cpu in cpus_available():
         govs = read_govs(cpu)
+        gov = None
 
         if "schedutil" in govs:
             gov = "schedutil"
@@ -135,27 +344,29 @@ def apply_balanced():
         if not gov:
             print("Failed to get default governor for CPU {}.".format(cpu))
             continue
+        governors[cpu] = gov
 
-        ret = HELPER.update_cpu_governor(cpu, gov)
-        if ret == 0:
-            print("Set CPU {} to {}".format(cpu, gov))
-
+    _apply_governors(governors)
     return 0
 
 
 def apply_energy_preference(pref):
     """Set CPU energy profile"""
-    if not HELPER.isauthorized():
+    if not HELPER.isauthorized(timeout=CALL_TIMEOUT):
         print("User is not authorised. No changes applied.")
         return -1
 
+    topology = CpuTopologySnapshot()
+    request = {}
     for cpu in cpus_available():
         if pref not in read_available_energy_prefs(cpu):
             print("Preference not available for CPU {}.".format(cpu))
             continue
+        request[cpu] = (0, 0, "", topology.is_online(cpu), pref)
 
-        ret = HELPER.update_cpu_energy_prefs(cpu, pref)
-        if ret == 0:
+    results = apply_cpu_settings(request)
+    for cpu in request:
+        if results.get(cpu, -1) == 0:
             print("Set CPU {} to {}".format(cpu, pref))
 
     return 0
@@ -163,12 +374,12 @@ def apply_energy_preference(pref):
 
 def set_cpu_offline(cpu):
     """Set cpu to offline"""
-    if not HELPER.isauthorized():
+    if not HELPER.isauthorized(timeout=CALL_TIMEOUT):
         print("User is not authorised. No changes applied.")
         return -1
 
     try:
-        ret = HELPER.set_cpu_offline(cpu)
+        ret = HELPER.set_cpu_offline(cpu, timeout=CALL_TIMEOUT)
     except dbus.exceptions.DBusException:
         ret = -1
 
@@ -180,11 +391,11 @@ def set_cpu_offline(cpu):
 
 def set_cpu_online(cpu):
     """Set cpu to online"""
-    if not HELPER.isauthorized():
+    if not HELPER.isauthorized(timeout=CALL_TIMEOUT):
         print("User is not authorised. No changes applied.")
         return -1
 
-    ret = HELPER.set_cpu_online(cpu)
+    ret = HELPER.set_cpu_online(cpu, timeout=CALL_TIMEOUT)
     if ret == 0:
         print("OK")
     else:
@@ -201,10 +412,11 @@ def set_cpu_min_freq(cpu, freq):
     """
     freq = int(freq * 1e3)
     if cpu in cpus_available():
-        fmin, fmax = read_freqs(cpu)
-        hmin, hmax = read_freq_lims(cpu)
+        topology = CpuTopologySnapshot()
+        fmin, fmax = read_freqs(cpu, topology)
+        hmin, hmax = read_freq_lims(cpu, topology)
         if hmin <= freq <= hmax:
-            HELPER.update_cpu_settings(cpu, freq, fmax)
+            HELPER.update_cpu_settings(cpu, freq, fmax, timeout=CALL_TIMEOUT)
             print("OK")
         else:
             print("Frequency out of range: {} < freq < {}".format(hmin, hmax))
@@ -220,10 +432,11 @@ def set_cpu_max_freq(cpu, freq):
     """
     freq = int(freq * 1e3)
     if cpu in cpus_available():
-        fmin, fmax = read_freqs(cpu)
-        hmin, hmax = read_freq_lims(cpu)
+        topology = CpuTopologySnapshot()
+        fmin, fmax = read_freqs(cpu, topology)
+        hmin, hmax = read_freq_lims(cpu, topology)
         if hmin <= freq <= hmax:
-            HELPER.update_cpu_settings(cpu, fmin, freq)
+            HELPER.update_cpu_settings(cpu, fmin, freq, timeout=CALL_TIMEOUT)
             print("OK")
         else:
             print(
@@ -233,6 +446,88 @@ def set_cpu_max_freq(cpu, freq):
 
 def get_cpu_frequencies(cpu):
     """Return frequencies for cpu"""
-    fmin, fmax = read_freqs(cpu)
-    hmin, hmax = read_freq_lims(cpu)
+    topology = CpuTopologySnapshot()
+    fmin, fmax = read_freqs(cpu, topology)
+    hmin, hmax = read_freq_lims(cpu, topology)
     return (fmin / 1e3, fmax / 1e3), (hmin / 1e3, hmax / 1e3)
+
+
+def get_cpus_frequencies(cpus, parallel=None):
+    """Return frequencies for cpus reading each cpufreq policy once
+
+    Args:
+        cpus: Iterable of cpus to query
+        parallel: Run the batched read on a thread pool, see read_attributes()
+
+    Returns:
+        frequencies: Dict mapping each cpu to its frequencies and limits
+
+    """
+    cpus = list(cpus)
+    topology = CpuTopologySnapshot()
+    policies = read_policies()
+    states = read_cpu_states(cpus, topology, policies, parallel)
+    lims = read_per_policy(read_freq_lims, cpus, topology, policies=policies)
+
+    frequencies = {}
+    for cpu in cpus:
+        fmin, fmax = states[cpu]["freqs"]
+        hmin, hmax = lims[cpu]
+        frequencies[cpu] = (fmin / 1e3, fmax / 1e3), (hmin / 1e3, hmax / 1e3)
+    return frequencies
+
+
+def _record_to_state(record):
+    cpu, online, hw_min, hw_max, fmin, fmax, gov, pref, cur = record
+    return int(cpu), {
+        "freqs": (int(fmin), int(fmax)),
+        "governor": str(gov),
+        "online": bool(online),
+        "energy_pref": str(pref),
+        "limits": (int(hw_min), int(hw_max)),
+        "current": int(cur),
+    }
+
+
+def get_all_cpu_state():
+    """Return the state of every available cpu with one helper call
+
+    Returns:
+        states: Dict mapping each cpu to a dict with the same keys as
+            read_cpu_states() plus 'limits' and 'current', in kHz
+
+    """
+    return dict(_record_to_state(record) for record in HELPER.get_all_cpu_state())
+
+
+def subscribe_cpu_updates(on_sample, on_state=None, interval=500):
+    """Receive frequency samples and state changes pushed by the helper
+
+    Args:
+        on_sample: Called with a dict mapping cpu to current frequency in kHz
+        on_state: Optional, called with a dict of the changed cpus in the
+            format of get_all_cpu_state()
+        interval: Requested sampling interval in ms
+
+    Returns:
+        interval: The sampling interval of the helper, None if the helper
+            does not support subscriptions
+
+    """
+    try:
+        interval = HELPER.subscribe(interval)
+    except dbus.exceptions.DBusException:
+        return None
+
+    BUS.add_signal_receiver(
+        lambda freqs: on_sample({int(cpu): int(f) for cpu, f in freqs.items()}),
+        signal_name="FrequencySample",
+        dbus_interface="org.rnd2.cpupower_gui.helper",
+    )
+    if on_state is not None:
+        BUS.add_signal_receiver(
+            lambda records: on_state(dict(map(_record_to_state, records))),
+            signal_name="CpuStateChanged",
+            dbus_interface="org.rnd2.cpupower_gui.helper",
+        )
+    return int(interval)
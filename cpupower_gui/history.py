@@ -0,0 +1,112 @@
+"""Module for per-CPU frequency history"""
+
+from array import array
+
+
+class FreqHistory:
+    """Fixed size ring buffer of frequency samples for each CPU
+
+    Every CPU gets one preallocated array('I') of horizon samples in kHz,
+    so memory use does not grow with uptime. A sample of 0 means that
+    the CPU was offline or could not be read and is left out of the
+    statistics.
+    """
+
+    def __init__(self, cpus, horizon=120):
+        self.horizon = horizon
+        self._rings = {cpu: array("I", [0]) * horizon for cpu in cpus}
+        self._pos = 0
+        self._count = 0
+
+    def __len__(self):
+        """Number of samples held for each CPU"""
+        return min(self._count, self.horizon)
+
+    @property
+    def cpus(self):
+        return list(self._rings)
+
+    def add(self, sample):
+        """Append a sample
+
+        Args:
+            sample: Dict mapping cpu to frequency in kHz, missing CPUs
+                are stored as 0
+
+        """
+        pos = self._pos
+        for cpu, ring in self._rings.items():
+            ring[pos] = sample.get(cpu, 0)
+        self._pos = (pos + 1) % self.horizon
+        self._count += 1
+
+    def window(self, cpu, size=None):
+        """Returns the latest samples of cpu, oldest first
+
+        Args:
+            cpu: Index of cpu to query
+            size: Number of samples, defaults to all held samples
+
+        Returns:
+            samples: array('I') of frequencies in kHz
+
+        """
+        ring = self._rings[cpu]
+        held = len(self)
+        size = held if size is None else max(0, min(size, held))
+        start = self._pos - size
+        if start >= 0:
+            return ring[start : self._pos]
+        return ring[start:] + ring[: self._pos]
+
+    def _valid(self, cpu, size):
+        samples = self.window(cpu, size)
+        if 0 in samples:
+            samples = array("I", [freq for freq in samples if freq])
+        return samples
+
+    def min(self, cpu, size=None):
+        samples = self._valid(cpu, size)
+        return min(samples) if samples else 0
+
+    def max(self, cpu, size=None):
+        samples = self._valid(cpu, size)
+        return max(samples) if samples else 0
+
+    def mean(self, cpu, size=None):
+        samples = self._valid(cpu, size)
+        return sum(samples) / len(samples) if samples else 0.0
+
+    def percentile(self, cpu, percent, size=None):
+        """Returns the nearest-rank percentile of the samples of cpu
+
+        Args:
+            cpu: Index of cpu to query
+            percent: Percentile between 0 and 100
+            size: Number of latest samples to use
+
+        """
+        samples = sorted(self._valid(cpu, size))
+        if not samples:
+            return 0
+        rank = max(1, -(-percent * len(samples) // 100))
+        return samples[min(int(rank), len(samples)) - 1]
+
+    def stats(self, cpu, size=None):
+        """Returns min, mean, max and 95th percentile of cpu in kHz
+
+        Returns:
+            stats: Dict with the statistics, None if there are no samples
+
+        """
+        samples = sorted(self._valid(cpu, size))
+        if not samples:
+            return None
+
+        count = len(samples)
+        return {
+            "min": samples[0],
+            "mean": sum(samples) / count,
+            "max": samples[-1],
+            "p95": samples[max(1, -(-95 * count // 100)) - 1],
+        }
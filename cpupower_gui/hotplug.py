@@ -0,0 +1,124 @@
+"""Module for CPU hotplug notifications from kernel uevents"""
+
+import errno
+import socket
+
+NETLINK_KOBJECT_UEVENT = 15
+KERNEL_EVENTS = 1  # Multicast group of uevents sent by the kernel
+RECV_SIZE = 8192
+
+ACTIONS = ("online", "offline", "add", "remove")
+
+# Event reported when uevents were dropped, the topology must be reread
+RESYNC = (None, "resync")
+
+
+def parse_uevent(data):
+    """Parse a kernel uevent message
+
+    Args:
+        data: Raw uevent message, NUL separated KEY=VALUE pairs
+
+    Returns:
+        event: A (cpu, action) tuple for CPU hotplug events, None otherwise
+
+    """
+    env = {}
+    for field in data.split(b"\0")[1:]:
+        key, sep, value = field.partition(b"=")
+        if sep:
+            env[key] = value
+
+    if env.get(b"SUBSYSTEM") != b"cpu":
+        return None
+
+    action = env.get(b"ACTION", b"").decode()
+    if action not in ACTIONS:
+        return None
+
+    name = env.get(b"DEVPATH", b"").rsplit(b"/", 1)[-1]
+    if not name.startswith(b"cpu") or not name[3:].isdigit():
+        return None
+
+    return int(name[3:]), action
+
+
+class HotplugMonitor:
+    """Listens for CPU online/offline uevents
+
+    The socket is non-blocking, poll fileno() for readability and call
+    read_events() to collect the pending events.
+    """
+
+    def __init__(self):
+        self._sock = socket.socket(
+            socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT
+        )
+        try:
+            self._sock.bind((0, KERNEL_EVENTS))
+            self._sock.setblocking(False)
+        except OSError:
+            self._sock.close()
+            raise
+
+    def fileno(self):
+        return self._sock.fileno()
+
+    def read_events(self):
+        """Returns a list of pending (cpu, action) events
+
+        If the kernel dropped events because the socket buffer was full,
+        the list contains RESYNC and the events cannot be trusted.
+        """
+        events = []
+        while True:
+            try:
+                data = self._sock.recv(RECV_SIZE)
+            except InterruptedError:
+                continue
+            except BlockingIOError:
+                break
+            except OSError as exc:
+                if exc.errno == errno.ENOBUFS:
+                    # Reported once per overflow, later events are intact
+                    if RESYNC not in events:
+                        events.append(RESYNC)
+                    continue
+                print("WARNING! Failed to read CPU hotplug events:", exc)
+                break
+            event = parse_uevent(data)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def close(self):
+        self._sock.close()
+
+
+def watch_hotplug(callback):
+    """Call callback(events) from the GLib main loop on CPU hotplug
+
+    Args:
+        callback: Function that receives a list of (cpu, action) tuples,
+            see HotplugMonitor.read_events()
+
+    Returns:
+        monitor: The HotplugMonitor, or None if uevents are not available
+
+    """
+    from gi.repository import GLib
+
+    try:
+        monitor = HotplugMonitor()
+    except (OSError, AttributeError):
+        # No netlink support (or AF_NETLINK missing on this platform)
+        return None
+
+    def on_readable(fd, condition):
+        events = monitor.read_events()
+        if events:
+            callback(events)
+        return True
+
+    GLib.io_add_watch(monitor.fileno(), GLib.PRIORITY_DEFAULT, GLib.IO_IN, on_readable)
+    return monitor
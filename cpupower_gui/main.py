@@ -34,13 +34,21 @@ try:
 except (ValueError, ImportError):
     AppIndicator = None
 
-from .helper import apply_balanced, apply_performance, apply_cpu_profile
+from .helper import (
+    apply_balanced,
+    apply_cpu_profile,
+    apply_performance,
+    get_all_cpu_state,
+)
 from .window import CpupowerGuiWindow
 from .config import CpuPowerConfig
 
 BUS = dbus.SystemBus()
+# Follow the helper across restarts, it exits when idle
 SESSION = BUS.get_object(
-    "org.rnd2.cpupower_gui.helper", "/org/rnd2/cpupower_gui/helper"
+    "org.rnd2.cpupower_gui.helper",
+    "/org/rnd2/cpupower_gui/helper",
+    follow_name_owner_changes=True,
 )
 
 HELPER = dbus.Interface(SESSION, "org.rnd2.cpupower_gui.helper")
@@ -131,8 +139,9 @@ class Application(Gtk.Application):
         # Update window if exists
         win = self.props.active_window
         if win:
+            states = get_all_cpu_state()
             for cpu in win.settings.keys():
-                win._refresh_cpu_settings(cpu)
+                win._refresh_cpu_settings(cpu, state=states.get(cpu))
 
         return 0
 
@@ -142,8 +151,9 @@ class Application(Gtk.Application):
         # Update window if exists
         win = self.props.active_window
         if win:
+            states = get_all_cpu_state()
             for cpu in win.settings.keys():
-                win._refresh_cpu_settings(cpu)
+                win._refresh_cpu_settings(cpu, state=states.get(cpu))
 
         return 0
 
@@ -153,8 +163,9 @@ class Application(Gtk.Application):
         # Update window if exists
         win = self.props.active_window
         if win:
+            states = get_all_cpu_state()
             for cpu in win.settings.keys():
-                win._refresh_cpu_settings(cpu)
+                win._refresh_cpu_settings(cpu, state=states.get(cpu))
 
         return 0
 
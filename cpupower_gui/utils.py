@@ -1,6 +1,12 @@
+import os
+import time
 from pathlib import Path
 
-SYS_PATH = "/sys/devices/system/cpu/cpu{}/cpufreq"
+# Root of the sysfs mount, can be overridden to read a synthetic tree
+SYSFS_ROOT = os.environ.get("CPUPOWER_GUI_SYSFS", "/sys")
+CPU_PATH = os.path.join(SYSFS_ROOT, "devices/system/cpu")
+
+SYS_PATH = os.path.join(CPU_PATH, "cpu{}/cpufreq")
 CURR_FREQ = "scaling_cur_freq"
 FREQ_MIN = "scaling_min_freq"
 FREQ_MAX = "scaling_max_freq"
@@ -11,76 +17,331 @@ AVAIL_GOV = "scaling_available_governors"
 AVAIL_PERF_PREF = "energy_performance_available_preferences"
 PERF_PREF = "energy_performance_preference"
 GOVERNOR = "scaling_governor"
-ONLINE = Path("/sys/devices/system/cpu/online")
-PRESENT = Path("/sys/devices/system/cpu/present")
-ONLINE_PATH = "/sys/devices/system/cpu/cpu{}/online"
+SCALING_DRIVER = "scaling_driver"
+ONLINE = Path(CPU_PATH, "online")
+PRESENT = Path(CPU_PATH, "present")
+ONLINE_PATH = os.path.join(CPU_PATH, "cpu{}/online")
+POLICY_PATH = os.path.join(CPU_PATH, "cpufreq")
+CPUINFO = Path("/proc/cpuinfo")
+# Batched reads use a thread pool unless set to 0
+PARALLEL_READS = os.environ.get("CPUPOWER_GUI_PARALLEL_READS", "1") != "0"
+MAX_READ_WORKERS = 16
+RELATED_CPUS = "related_cpus"
+AFFECTED_CPUS = "affected_cpus"
+
+
+class CpuSet:
+    """Set of CPU indices stored as an integer bitmask
+
+    Membership is a single bit test and the set operators work on whole
+    masks, so large CPU counts stay cheap. Iteration yields the CPUs in
+    ascending order and str() gives a core list like '0-3,8-11'.
+    """
+
+    __slots__ = ("_mask",)
+
+    def __init__(self, cpus=()):
+        mask = 0
+        if isinstance(cpus, CpuSet):
+            mask = cpus._mask
+        else:
+            for cpu in cpus:
+                mask |= 1 << int(cpu)
+        self._mask = mask
+
+    @classmethod
+    def from_mask(cls, mask):
+        """Create a CpuSet from an integer bitmask"""
+        cpuset = cls()
+        cpuset._mask = mask
+        return cpuset
+
+    @property
+    def mask(self):
+        """The set as an integer bitmask"""
+        return self._mask
+
+    def __contains__(self, cpu):
+        try:
+            cpu = int(cpu)
+        except (TypeError, ValueError):
+            return False
+        return cpu >= 0 and bool((self._mask >> cpu) & 1)
+
+    def __iter__(self):
+        mask = self._mask
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    def __len__(self):
+        return bin(self._mask).count("1")
+
+    def __bool__(self):
+        return self._mask != 0
+
+    def __eq__(self, other):
+        if not isinstance(other, CpuSet):
+            return NotImplemented
+        return self._mask == other._mask
+
+    def __hash__(self):
+        return hash(self._mask)
+
+    def __or__(self, other):
+        return CpuSet.from_mask(self._mask | CpuSet(other)._mask)
+
+    def __and__(self, other):
+        return CpuSet.from_mask(self._mask & CpuSet(other)._mask)
+
+    def __sub__(self, other):
+        return CpuSet.from_mask(self._mask & ~CpuSet(other)._mask)
+
+    def __xor__(self, other):
+        return CpuSet.from_mask(self._mask ^ CpuSet(other)._mask)
+
+    def __le__(self, other):
+        return self._mask & ~CpuSet(other)._mask == 0
+
+    def ranges(self):
+        """Yields (first, last) tuples for each run of consecutive CPUs"""
+        mask = self._mask
+        offset = 0
+        while mask:
+            # Skip the zeros below the run, then measure the run of ones
+            skip = (mask & -mask).bit_length() - 1
+            mask >>= skip
+            offset += skip
+            length = (~mask & (mask + 1)).bit_length() - 1
+            yield offset, offset + length - 1
+            mask >>= length
+            offset += length
+
+    def __str__(self):
+        return ",".join(
+            str(first) if first == last else "{}-{}".format(first, last)
+            for first, last in self.ranges()
+        )
+
+    def __repr__(self):
+        return "CpuSet('{}')".format(self)
 
 
 def parse_core_list(string):
-    """Parse string of cores like '0,2,4-10,12' into a list"""
-    cores = []
-    for elem in string.split(","):
+    """Parse string of cores like '0,2,4-10,12' into a CpuSet"""
+    mask = 0
+    for elem in string.strip().split(","):
+        if not elem:
+            continue
         if "-" in elem:
             start, end = [int(c) for c in elem.split("-")]
-            cores.extend(range(start, end + 1))
+            if start < 0 or end < start:
+                raise ValueError("Invalid core range: {}".format(elem))
+            mask |= ((1 << (end - start + 1)) - 1) << start
         else:
-            cores.append(int(elem))
-    return cores
+            mask |= 1 << int(elem)
+    return CpuSet.from_mask(mask)
+
+
+class CpufreqPolicy:
+    """A cpufreq policy and the CPUs that share it
+
+    Attributes:
+        name: Name of the policy directory, e.g. policy0
+        related_cpus: All CPUs that use the policy
+        affected_cpus: The online CPUs that use the policy
+
+    """
+
+    def __init__(self, name, related_cpus, affected_cpus):
+        self.name = name
+        self.related_cpus = related_cpus
+        self.affected_cpus = affected_cpus
+
+    def __repr__(self):
+        return "CpufreqPolicy({}, related={}, affected={})".format(
+            self.name, self.related_cpus, self.affected_cpus
+        )
+
+    @property
+    def cpu(self):
+        """The CPU that is read on behalf of the whole policy"""
+        if self.affected_cpus:
+            return min(self.affected_cpus)
+        return min(self.related_cpus)
+
+
+def read_policies():
+    """Returns a dict mapping each CPU to its cpufreq policy"""
+    policies = {}
+    try:
+        paths = list(Path(POLICY_PATH).glob("policy*"))
+    except OSError:
+        return policies
+
+    for path in paths:
+        try:
+            related = (path / RELATED_CPUS).read_text().strip()
+            affected = (path / AFFECTED_CPUS).read_text().strip()
+        except OSError:
+            continue
+
+        if not related:
+            continue
+
+        policy = CpufreqPolicy(
+            path.name,
+            parse_core_list(related.replace(" ", ",")),
+            parse_core_list(affected.replace(" ", ",")),
+        )
+        for cpu in policy.related_cpus:
+            policies[cpu] = policy
+    return policies
+
+
+def policy_leader(cpu, policies):
+    """Returns the CPU whose cpufreq attributes are shared with cpu
+
+    Args:
+        cpu: Index of cpu to query
+        policies: Dict returned by read_policies()
+
+    Returns:
+        leader: The reading CPU of the policy, or cpu itself if it is
+            offline or does not belong to a policy
+
+    """
+    policy = policies.get(cpu)
+    if policy is not None and cpu in policy.affected_cpus:
+        return policy.cpu
+    return cpu
+
+
+def group_by_policy(cpus, policies=None):
+    """Group cpus that share a cpufreq policy
+
+    Args:
+        cpus: Iterable of cpus to group
+        policies: Optional dict returned by read_policies()
+
+    Returns:
+        groups: Dict mapping the reading CPU of each policy to the list
+            of cpus in it
+
+    """
+    if policies is None:
+        policies = read_policies()
+
+    groups = {}
+    for cpu in cpus:
+        groups.setdefault(policy_leader(cpu, policies), []).append(cpu)
+    return groups
+
+
+def read_per_policy(reader, cpus, *args, policies=None):
+    """Read a cpufreq attribute once per policy and fan it out to cpus
+
+    Args:
+        reader: Function called as reader(cpu, *args)
+        cpus: Iterable of cpus to read
+        policies: Optional dict returned by read_policies()
+
+    Returns:
+        values: Dict mapping each cpu to the value read for its policy
+
+    """
+    if policies is None:
+        policies = read_policies()
+
+    read = {}
+    values = {}
+    for cpu in cpus:
+        leader = policy_leader(cpu, policies)
+        if leader not in read:
+            read[leader] = reader(leader, *args)
+        values[cpu] = read[leader]
+    return values
 
 
 def cpus_present():
-    """Returns a list of present CPUs"""
+    """Returns a CpuSet of present CPUs"""
     cpus = PRESENT.read_text().strip()
     return parse_core_list(cpus)
 
 
 def cpus_online():
-    """Returns a list of online CPUs"""
+    """Returns a CpuSet of online CPUs"""
     cpus = ONLINE.read_text().strip()
     return parse_core_list(cpus)
 
 
 def cpus_offline():
-    """Returns a list of offline CPUs"""
-    online = cpus_online()
-    present = cpus_present()
-    return [cpu for cpu in present if cpu not in online]
+    """Returns a CpuSet of offline CPUs"""
+    return cpus_present() - cpus_online()
+
+
+class CpuTopologySnapshot:
+    """Present and online CPUs read once from sysfs
+
+    Pass a snapshot to the readers below to avoid re-reading the
+    online and present lists for every CPU during a refresh.
+    """
+
+    def __init__(self):
+        self.present = cpus_present()
+        self.online = cpus_online()
+
+    def __eq__(self, other):
+        if not isinstance(other, CpuTopologySnapshot):
+            return NotImplemented
+        return self.present == other.present and self.online == other.online
+
+    def __repr__(self):
+        return "CpuTopologySnapshot(present='{}', online='{}')".format(
+            self.present, self.online
+        )
+
+    def is_online(self, cpu):
+        """Returns True if cpu is present and online"""
+        return cpu in self.present and cpu in self.online
 
 
 def cpus_available():
-    online = cpus_present()
-    avail = []
-    for cpu in online:
+    """Returns a CpuSet of present CPUs with cpufreq support"""
+    present = cpus_present()
+    mask = 0
+    for cpu in present:
         sys_path = Path(SYS_PATH.format(cpu))
         if (
             (sys_path / FREQ_MIN_HW).exists()
             and (sys_path / FREQ_MAX_HW).exists()
             and (sys_path / AVAIL_GOV).exists()
         ):
-            avail.append(cpu)
-    return avail
+            mask |= 1 << cpu
+    return CpuSet.from_mask(mask)
 
 
-def is_online(cpu):
+def is_online(cpu, topology=None):
     """Wrapper to get the online state for a cpu
 
     Args:
         cpu: Index of cpu to query
+        topology: Optional CpuTopologySnapshot to query instead of sysfs
 
     Returns:
         bool: True if cpu is online, False otherwise
 
     """
-
-    online = cpus_online()
-    present = cpus_present()
-    return (cpu in present) and (cpu in online)
+    if topology is None:
+        topology = CpuTopologySnapshot()
+    return topology.is_online(cpu)
 
 
-def read_current_freq(cpu):
+def read_current_freq(cpu, topology=None):
     """Reads current frequency from sysfs"""
     freq = 0
-    if is_online(cpu):
+    if is_online(cpu, topology):
         sys_path = Path(SYS_PATH.format(int(cpu)))
 
         freq = int((sys_path / CURR_FREQ).read_text())
@@ -88,11 +349,187 @@ def read_current_freq(cpu):
     return freq
 
 
-def read_freqs(cpu):
+class CurrentFreqSampler:
+    """Samples scaling_cur_freq through file descriptors kept open
+
+    The descriptors are reread with pread() on every sample and are only
+    reopened by rebuild(), which should be called when CPUs go on or
+    offline.
+    """
+
+    read_size = 32
+
+    def __init__(self, cpus, topology=None):
+        self.cpus = list(cpus)
+        self._fds = {}
+        self.rebuild(topology)
+
+    def rebuild(self, topology=None, cpus=None):
+        """Reopen the descriptors for the online CPUs
+
+        Args:
+            topology: Optional CpuTopologySnapshot to use
+            cpus: Optional new list of CPUs to sample
+
+        """
+        if cpus is not None:
+            self.cpus = list(cpus)
+        if topology is None:
+            topology = CpuTopologySnapshot()
+
+        self.close()
+        for cpu in self.cpus:
+            if not topology.is_online(cpu):
+                continue
+            path = os.path.join(SYS_PATH.format(cpu), CURR_FREQ)
+            try:
+                self._fds[cpu] = os.open(path, os.O_RDONLY)
+            except OSError:
+                continue
+
+    def sample(self):
+        """Returns a dict with the current frequency of each CPU
+
+        CPUs that are offline or fail to read are reported as 0.
+        """
+        freqs = {}
+        fds = self._fds
+        for cpu in self.cpus:
+            fd = fds.get(cpu)
+            freq = 0
+            if fd is not None:
+                try:
+                    freq = int(os.pread(fd, self.read_size, 0))
+                except (OSError, ValueError):
+                    freq = 0
+            freqs[cpu] = freq
+        return freqs
+
+    def close(self):
+        """Close all open descriptors"""
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds = {}
+
+    def __del__(self):
+        self.close()
+
+
+def parse_cpuinfo_freqs(text):
+    """Parse the frequency of every processor from /proc/cpuinfo
+
+    Args:
+        text: Contents of /proc/cpuinfo
+
+    Returns:
+        freqs: Dict mapping cpu to its 'cpu MHz' value in kHz
+
+    """
+    freqs = {}
+    # Every processor is a block separated by an empty line
+    for block in text.split("\n\n"):
+        start = block.find("cpu MHz")
+        if start < 0 or not block.startswith("processor"):
+            continue
+        end = block.find("\n", start)
+        try:
+            cpu = int(block[: block.find("\n")].partition(":")[2])
+            mhz = float(block[start : end if end > 0 else None].partition(":")[2])
+        except ValueError:
+            continue
+        freqs[cpu] = int(mhz * 1000)
+    return freqs
+
+
+class CpuinfoFreqSampler:
+    """Samples the frequency of all CPUs with a single /proc/cpuinfo read
+
+    Only some architectures (e.g. x86) report 'cpu MHz', check available
+    before using it. Offline CPUs are not listed and are reported as 0.
+    """
+
+    def __init__(self, cpus, topology=None):
+        self.cpus = list(cpus)
+        self.available = bool(self._read())
+
+    def rebuild(self, topology=None, cpus=None):
+        """Update the list of CPUs to sample
+
+        Args:
+            topology: Unused, the kernel only lists online CPUs
+            cpus: Optional new list of CPUs to sample
+
+        """
+        if cpus is not None:
+            self.cpus = list(cpus)
+
+    @staticmethod
+    def _read():
+        try:
+            return parse_cpuinfo_freqs(CPUINFO.read_text())
+        except OSError:
+            return {}
+
+    def sample(self):
+        """Returns a dict with the current frequency of each CPU"""
+        freqs = self._read()
+        return {cpu: freqs.get(cpu, 0) for cpu in self.cpus}
+
+    def close(self):
+        """Nothing to release, provided for parity with CurrentFreqSampler"""
+
+
+FREQ_BACKENDS = {
+    "sysfs": CurrentFreqSampler,
+    "cpuinfo": CpuinfoFreqSampler,
+}
+
+
+def _sample_time(sampler, repeat=3):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        sampler.sample()
+    return time.perf_counter() - start
+
+
+def select_freq_sampler(cpus, backend="auto", topology=None):
+    """Returns a sampler for the current frequency of cpus
+
+    Args:
+        cpus: Iterable of cpus to sample
+        backend: 'sysfs', 'cpuinfo' or 'auto'. With 'auto' both backends
+            are timed and the cheaper one is returned.
+        topology: Optional CpuTopologySnapshot to use
+
+    Returns:
+        sampler: An object with sample(), rebuild() and close() methods
+
+    Raises:
+        ValueError: If backend is unknown
+
+    """
+    cpus = list(cpus)
+    if backend != "auto":
+        if backend not in FREQ_BACKENDS:
+            raise ValueError("Unknown frequency backend: {}".format(backend))
+        return FREQ_BACKENDS[backend](cpus, topology)
+
+    sysfs = CurrentFreqSampler(cpus, topology)
+    cpuinfo = CpuinfoFreqSampler(cpus, topology)
+    if not cpuinfo.available:
+        return sysfs
+
+    if _sample_time(cpuinfo) < _sample_time(sysfs):
+        sysfs.close()
+        return cpuinfo
+    return sysfs
+
+
+def read_freqs(cpu, topology=None):
     """Reads frequencies from sysfs"""
     freq_min = 0
     freq_max = 0
-    if is_online(cpu):
+    if is_online(cpu, topology):
         sys_path = Path(SYS_PATH.format(int(cpu)))
 
         freq_min = int((sys_path / FREQ_MIN).read_text())
@@ -101,16 +538,146 @@ def read_freqs(cpu):
     return freq_min, freq_max
 
 
-def read_freq_lims(cpu):
+class StaticAttributeCache:
+    """Memoizes cpufreq attributes that only change on hotplug or driver change
+
+    Values are cached per cpu and attribute as the stripped file contents.
+    Missing attributes are cached too, other failed reads are not. Call
+    sync() when the topology may have changed or invalidate() to drop
+    values explicitly.
+
+    Attributes:
+        hits: Number of reads answered from the cache
+        misses: Number of reads that went to sysfs
+
+    """
+
+    _missing = object()
+
+    def __init__(self):
+        self._values = {}
+        self._online = None
+        self._driver = None
+        self.hits = 0
+        self.misses = 0
+
+    def read(self, cpu, attribute):
+        """Returns the stripped contents of attribute for cpu
+
+        Raises:
+            OSError: If the attribute could not be read
+
+        """
+        key = (cpu, attribute)
+        value = self._values.get(key)
+        if value is not None:
+            self.hits += 1
+            if value is self._missing:
+                raise FileNotFoundError(attribute)
+            return value
+
+        self.misses += 1
+        try:
+            sys_file = Path(SYS_PATH.format(int(cpu))) / attribute
+            value = sys_file.read_text().strip()
+        except FileNotFoundError:
+            # Remember attributes the driver does not provide
+            self._values[key] = self._missing
+            raise
+        self._values[key] = value
+        return value
+
+    def reset(self):
+        """Drop all cached values, sync state and counters"""
+        self._values.clear()
+        self._online = None
+        self._driver = None
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, cpus=None):
+        """Drop the cached values
+
+        Args:
+            cpus: Iterable of cpus to drop, or None to drop everything
+
+        """
+        if cpus is None:
+            self._values.clear()
+            return
+
+        cpus = set(cpus)
+        for key in [key for key in self._values if key[0] in cpus]:
+            del self._values[key]
+
+    def sync(self, topology=None):
+        """Invalidate CPUs that changed online state since the last sync
+
+        Everything is dropped if the scaling driver has changed.
+
+        Args:
+            topology: Optional CpuTopologySnapshot to compare against
+
+        """
+        if topology is None:
+            topology = CpuTopologySnapshot()
+
+        online = topology.online & topology.present
+        synced = self._online is not None
+        if synced and online != self._online:
+            self.invalidate(online ^ self._online)
+        self._online = online
+
+        driver = None
+        for cpu in sorted(online):
+            try:
+                sys_path = Path(SYS_PATH.format(cpu))
+                driver = (sys_path / SCALING_DRIVER).read_text().strip()
+            except OSError:
+                continue
+            break
+
+        if synced and driver != self._driver:
+            self.invalidate()
+        self._driver = driver
+
+    @property
+    def stats(self):
+        """Returns a dict with the hit, miss and size counters"""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._values)}
+
+
+STATIC_CACHE = StaticAttributeCache()
+
+
+def set_sysfs_root(root):
+    """Read CPU attributes from a different sysfs root
+
+    Args:
+        root: Path of the directory that replaces /sys
+
+    """
+    global SYSFS_ROOT, CPU_PATH, SYS_PATH, ONLINE_PATH, POLICY_PATH
+    global ONLINE, PRESENT
+
+    SYSFS_ROOT = str(root)
+    CPU_PATH = os.path.join(SYSFS_ROOT, "devices/system/cpu")
+    SYS_PATH = os.path.join(CPU_PATH, "cpu{}/cpufreq")
+    ONLINE = Path(CPU_PATH, "online")
+    PRESENT = Path(CPU_PATH, "present")
+    ONLINE_PATH = os.path.join(CPU_PATH, "cpu{}/online")
+    POLICY_PATH = os.path.join(CPU_PATH, "cpufreq")
+    STATIC_CACHE.reset()
+
+
+def read_freq_lims(cpu, topology=None):
     """Reads frequency limits from sysfs"""
     freq_minhw = 0
     freq_maxhw = 0
-    if is_online(cpu):
+    if is_online(cpu, topology):
         try:
-            sys_path = Path(SYS_PATH.format(int(cpu)))
-
-            freq_minhw = int((sys_path / FREQ_MIN_HW).read_text())
-            freq_maxhw = int((sys_path / FREQ_MAX_HW).read_text())
+            freq_minhw = int(STATIC_CACHE.read(cpu, FREQ_MIN_HW))
+            freq_maxhw = int(STATIC_CACHE.read(cpu, FREQ_MAX_HW))
 
         except Exception as exc:
             print("WARNING! Unknown CPU frequency, cause:", exc)
@@ -120,10 +687,8 @@ def read_freq_lims(cpu):
 
 def read_govs(cpu):
     """Reads governors from sysfs"""
-    sys_path = Path(SYS_PATH.format(int(cpu)))
     try:
-        sys_file = sys_path / AVAIL_GOV
-        govs = sys_file.read_text().strip().split(" ")
+        govs = STATIC_CACHE.read(cpu, AVAIL_GOV).split(" ")
     except OSError:
         govs = []
     finally:
@@ -132,21 +697,19 @@ def read_govs(cpu):
 
 def read_available_frequencies(cpu):
     """Reads available frequencies from sysfs"""
-    sys_path = Path(SYS_PATH.format(int(cpu)))
     try:
-        sys_file = sys_path / AVAIL_FREQS
-        freqs = sys_file.read_text().strip().split(" ")
+        freqs = STATIC_CACHE.read(cpu, AVAIL_FREQS).split(" ")
     except OSError:
         freqs = []
     finally:
         return freqs
 
 
-def read_governor(cpu):
+def read_governor(cpu, topology=None):
     """Reads governor from sysfs"""
     sys_path = Path(SYS_PATH.format(int(cpu)))
 
-    if not is_online(cpu):
+    if not is_online(cpu, topology):
         return "OFFLINE"
 
     try:
@@ -160,10 +723,8 @@ def read_governor(cpu):
 
 def read_available_energy_prefs(cpu):
     """Reads energy performance available preferences"""
-    sys_path = Path(SYS_PATH.format(int(cpu)))
     try:
-        sys_file = sys_path / AVAIL_PERF_PREF
-        prefs = sys_file.read_text().strip().split(" ")
+        prefs = STATIC_CACHE.read(cpu, AVAIL_PERF_PREF).split(" ")
     except OSError:
         prefs = []
     finally:
@@ -184,6 +745,185 @@ def read_energy_pref(cpu):
 
 def is_energy_pref_avail(cpu):
     """Check if Intel energy performance preferences are available"""
-    sys_path = Path(SYS_PATH.format(int(cpu)))
-    sys_file = sys_path / AVAIL_PERF_PREF
-    return sys_file.exists()
+    try:
+        STATIC_CACHE.read(cpu, AVAIL_PERF_PREF)
+    except OSError:
+        return False
+    return True
+
+
+def _read_attribute(request):
+    cpu, attribute = request
+    try:
+        return (Path(SYS_PATH.format(int(cpu))) / attribute).read_text().strip()
+    except OSError:
+        return None
+
+
+def read_attributes(requests, parallel=None, workers=MAX_READ_WORKERS):
+    """Read a batch of cpufreq attributes
+
+    Args:
+        requests: Iterable of (cpu, attribute) pairs
+        parallel: Run the reads on a thread pool, defaults to PARALLEL_READS
+        workers: Maximum number of threads
+
+    Returns:
+        values: Dict mapping each pair to the stripped contents of the
+            attribute, or None if it could not be read
+
+    """
+    requests = list(requests)
+    if parallel is None:
+        parallel = PARALLEL_READS
+
+    if not parallel or len(requests) < 2:
+        return {request: _read_attribute(request) for request in requests}
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(requests))) as pool:
+        values = pool.map(_read_attribute, requests)
+        return dict(zip(requests, values))
+
+
+def read_policy_attributes(
+    cpus, attributes, topology=None, policies=None, parallel=None
+):
+    """Batch read attributes once per cpufreq policy of the online cpus
+
+    Args:
+        cpus: Iterable of cpus to read
+        attributes: Attribute names to read
+        topology: Optional CpuTopologySnapshot to use
+        policies: Optional dict returned by read_policies()
+        parallel: Passed to read_attributes()
+
+    Returns:
+        values: Dict mapping each online cpu to a dict with the contents
+            of each attribute (None if it could not be read)
+
+    """
+    if topology is None:
+        topology = CpuTopologySnapshot()
+    if policies is None:
+        policies = read_policies()
+
+    leaders = {}
+    for cpu in cpus:
+        if topology.is_online(cpu):
+            leaders[cpu] = policy_leader(cpu, policies)
+
+    requests = [
+        (leader, attribute)
+        for leader in set(leaders.values())
+        for attribute in attributes
+    ]
+    read = read_attributes(requests, parallel)
+
+    values = {}
+    for cpu, leader in leaders.items():
+        values[cpu] = {attribute: read[(leader, attribute)] for attribute in attributes}
+    return values
+
+
+def _to_freq(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def read_cpu_states(cpus, topology=None, policies=None, parallel=None):
+    """Read frequencies, governor and energy preference of cpus in one batch
+
+    Args:
+        cpus: Iterable of cpus to read
+        topology: Optional CpuTopologySnapshot to use
+        policies: Optional dict returned by read_policies()
+        parallel: Passed to read_attributes()
+
+    Returns:
+        states: Dict mapping each cpu to a dict with 'freqs', 'governor',
+            'online' and 'energy_pref' keys
+
+    """
+    cpus = list(cpus)
+    if topology is None:
+        topology = CpuTopologySnapshot()
+
+    attributes = (FREQ_MIN, FREQ_MAX, GOVERNOR, PERF_PREF)
+    values = read_policy_attributes(cpus, attributes, topology, policies, parallel)
+
+    states = {}
+    for cpu in cpus:
+        attrs = values.get(cpu)
+        if attrs is None:
+            states[cpu] = {
+                "freqs": (0, 0),
+                "governor": "OFFLINE",
+                "online": False,
+                "energy_pref": "",
+            }
+            continue
+
+        governor = attrs[GOVERNOR]
+        states[cpu] = {
+            "freqs": (_to_freq(attrs[FREQ_MIN]), _to_freq(attrs[FREQ_MAX])),
+            "governor": governor if governor is not None else "ERROR",
+            "online": True,
+            "energy_pref": attrs[PERF_PREF] or "",
+        }
+    return states
+
+
+def read_cpu_records(cpus, topology=None, policies=None, parallel=None, current=None):
+    """Read the full state of cpus in one pass
+
+    Args:
+        cpus: Iterable of cpus to read
+        topology: Optional CpuTopologySnapshot to use
+        policies: Optional dict returned by read_policies()
+        parallel: Passed to read_attributes()
+        current: Optional dict mapping cpu to its current frequency, e.g.
+            from CurrentFreqSampler.sample(), instead of reading it again
+
+    Returns:
+        records: List of (cpu, online, hw_min, hw_max, fmin, fmax, governor,
+            energy_pref, current) tuples with the frequencies in kHz
+
+    """
+    cpus = list(cpus)
+    if topology is None:
+        topology = CpuTopologySnapshot()
+    if policies is None:
+        policies = read_policies()
+
+    states = read_cpu_states(cpus, topology, policies, parallel)
+    lims = read_per_policy(read_freq_lims, cpus, topology, policies=policies)
+    if current is None:
+        values = read_policy_attributes(
+            cpus, (CURR_FREQ,), topology, policies, parallel
+        )
+        current = {cpu: _to_freq(attrs[CURR_FREQ]) for cpu, attrs in values.items()}
+
+    records = []
+    for cpu in cpus:
+        state = states[cpu]
+        fmin, fmax = state["freqs"]
+        hw_min, hw_max = lims[cpu] if state["online"] else (0, 0)
+        cur = current.get(cpu, 0)
+        records.append(
+            (
+                cpu,
+                state["online"],
+                hw_min,
+                hw_max,
+                fmin,
+                fmax,
+                state["governor"],
+                state["energy_pref"],
+                cur,
+            )
+        )
+    return records
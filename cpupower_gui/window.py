@@ -37,12 +37,28 @@ except ValueError:
 import locale
 locale.setlocale(locale.LC_ALL, '')
 
-from .config import CpuPowerConfig, CpuSettings
-from .utils import read_available_frequencies, read_current_freq
+from .config import CpuPowerConfig, read_cpu_settings
+from .helper import (
+    CALL_TIMEOUT,
+    apply_cpu_settings_transaction,
+    subscribe_cpu_updates,
+)
+from .history import FreqHistory
+from .hotplug import watch_hotplug
+from .utils import (
+    STATIC_CACHE,
+    CpuSet,
+    CpuTopologySnapshot,
+    read_cpu_states,
+    select_freq_sampler,
+)
 
 BUS = dbus.SystemBus()
+# Follow the helper across restarts, it exits when idle
 SESSION = BUS.get_object(
-    "org.rnd2.cpupower_gui.helper", "/org/rnd2/cpupower_gui/helper"
+    "org.rnd2.cpupower_gui.helper",
+    "/org/rnd2/cpupower_gui/helper",
+    follow_name_owner_changes=True,
 )
 
 HELPER = dbus.Interface(SESSION, "org.rnd2.cpupower_gui.helper")
@@ -51,6 +67,7 @@ ERRORS = {
     -11: _("Setting governor failed."),
     -12: _("Setting energy preferences failed."),
     -13: _("Setting frequencies failed."),
+    -14: _("CPUs that share a frequency policy were given different settings."),
     -23: _("Setting governor and energy preferences failed."),
     -24: _("Setting governor and frequencies failed."),
     -25: _("Setting frequencies and energy preferences failed."),
@@ -188,7 +205,29 @@ class CpupowerGuiWindow(Gtk.ApplicationWindow):
         self.configure_gui()
         self.upd_sliders()
 
-        GLib.timeout_add(500, self._update_current_freq)
+        self._topology = CpuTopologySnapshot()
+        self.freq_sampler = None
+        self.hotplug = watch_hotplug(self.on_cpu_hotplug)
+        # Share the sampler of the helper, sample locally if not supported
+        interval = subscribe_cpu_updates(
+            self.on_frequency_sample, self.on_cpu_state_changed
+        )
+        if interval is None:
+            interval = 500
+            backend = self.gui_conf.get("frequency_backend", "auto")
+            try:
+                self.freq_sampler = select_freq_sampler(
+                    self.online_cpus, backend, self._topology
+                )
+            except ValueError:
+                self.freq_sampler = select_freq_sampler(self.online_cpus, "auto")
+            GLib.timeout_add(interval, self._update_current_freq)
+        elif self.hotplug is None:
+            GLib.timeout_add(interval, self._check_topology)
+        # One minute of samples
+        self.freq_history = FreqHistory(self.settings, horizon=60000 // interval)
+        self.tree_view.set_has_tooltip(True)
+        self.tree_view.connect("query-tooltip", self.on_tree_query_tooltip)
         # Application actions
         action = Gio.SimpleAction.new("Exit", None)
         action.connect("activate", self.quit)
@@ -211,8 +250,10 @@ class CpupowerGuiWindow(Gtk.ApplicationWindow):
 
     def load_cpu_settings(self):
         """Initialise the configuration store"""
-        for cpu in self.online_cpus:
-            self.settings[cpu] = CpuSettings(cpu)
+        topology = CpuTopologySnapshot()
+        STATIC_CACHE.sync(topology)
+        self.settings.update(read_cpu_settings(self.online_cpus, topology))
+        for cpu in self.settings.keys():
             self._update_treeview_style(cpu, False)
         self.energy_pref_avail = self.settings[0].energy_pref_avail
 
@@ -567,14 +608,109 @@ class CpupowerGuiWindow(Gtk.ApplicationWindow):
         """Callback to update the tree view with current CPU frequency"""    
         # path, _ = self.tree_view.get_cursor()
         # editing_row = int(path.to_string()) if path else None
-    
-        for cpu in self.online_cpus:
-            if cpu == self._editing_cpu:
+
+        if self.hotplug is None:
+            self._check_topology()
+
+        self.on_frequency_sample(self.freq_sampler.sample())
+        return True
+
+    def _check_topology(self):
+        """Poll the topology for changes, used without hotplug events"""
+        topology = CpuTopologySnapshot()
+        if topology != self._topology:
+            self._update_topology(topology)
+        return True
+
+    def on_frequency_sample(self, freqs):
+        """Update the tree view with current CPU frequencies
+
+        Args:
+            freqs: Dict mapping cpu to current frequency in kHz
+
+        """
+        self.freq_history.add(freqs)
+        for cpu, freq in freqs.items():
+            if cpu == self._editing_cpu or cpu not in self.settings:
                 continue # Skip over the editing row of the tree 
-            current_freq = read_current_freq(cpu) / 1e3
-            self.tree_store[cpu][5] = current_freq
+            self.tree_store[cpu][5] = freq / 1e3
+
+    def on_cpu_state_changed(self, states):
+        """Callback for settings changed outside of this window
+
+        Args:
+            states: Dict of the changed cpus from the helper
+
+        """
+        topology = CpuTopologySnapshot()
+        if topology != self._topology:
+            self._update_topology(topology)
+
+        for cpu, state in states.items():
+            conf = self.settings.get(cpu)
+            # Keep the changes that the user has not applied yet
+            if conf is None or conf.changed:
+                continue
+            conf.update_conf(topology, state)
+            self.update_tree_view(cpu, conf)
+
+        if self._get_active_cpu() in states:
+            self.upd_sliders()
+
+    def on_tree_query_tooltip(self, widget, x, y, keyboard_mode, tooltip):
+        """Show the frequency history of the CPU under the cursor"""
+        found, x, y, model, path, treeiter = widget.get_tooltip_context(
+            x, y, keyboard_mode
+        )
+        if not found:
+            return False
+
+        stats = self.freq_history.stats(model[treeiter][0])
+        if stats is None:
+            return False
+
+        text = _("Last minute: min {:.2f}, mean {:.2f}, max {:.2f}, p95 {:.2f} MHz")
+        tooltip.set_text(
+            text.format(
+                stats["min"] / 1e3,
+                stats["mean"] / 1e3,
+                stats["max"] / 1e3,
+                stats["p95"] / 1e3,
+            )
+        )
+        widget.set_tooltip_row(tooltip, path)
         return True
 
+    def on_cpu_hotplug(self, events):
+        """Callback for CPU hotplug events"""
+        topology = CpuTopologySnapshot()
+        if topology != self._topology:
+            self._update_topology(topology)
+
+    def _update_topology(self, topology):
+        """Refresh the CPUs that went on or offline
+
+        Args:
+            topology: The new CpuTopologySnapshot
+
+        """
+        old = self._topology
+        changed = (topology.online ^ old.online) | (topology.present ^ old.present)
+        self._topology = topology
+        STATIC_CACHE.sync(topology)
+        if self.freq_sampler is not None:
+            self.freq_sampler.rebuild(topology, self.online_cpus)
+
+        for cpu in changed:
+            conf = self.settings.get(cpu)
+            if conf is None:
+                continue
+            conf.update_conf(topology)
+            self.update_tree_view(cpu, conf)
+
+        if self._get_active_cpu() in changed:
+            self.upd_sliders()
+
     def on_freq_edited(self, widget, path, value, index):
         """Update the sliders when frequencies change from table"""
         value = locale.atof(value)
@@ -777,15 +913,18 @@ class CpupowerGuiWindow(Gtk.ApplicationWindow):
     @Gtk.Template.Callback()
     def on_refresh_clicked(self, *args):
         """Callback for refresh button"""
+        topology = CpuTopologySnapshot()
+        STATIC_CACHE.sync(topology)
         if self.toall.get_active():
+            states = read_cpu_states(self.settings.keys(), topology)
             for cpu in self.settings.keys():
-                self._refresh_cpu_settings(cpu)
+                self._refresh_cpu_settings(cpu, topology, states[cpu])
         else:
             cpu = self._get_active_cpu()
-            self._refresh_cpu_settings(cpu)
+            self._refresh_cpu_settings(cpu, topology)
 
-    def _refresh_cpu_settings(self, cpu):
-        self.settings[cpu].update_conf()
+    def _refresh_cpu_settings(self, cpu, topology=None, state=None):
+        self.settings[cpu].update_conf(topology, state)
         self.update_tree_view(cpu, self.settings[cpu])
 
         if self.energy_pref_avail:
@@ -903,32 +1042,35 @@ class CpupowerGuiWindow(Gtk.ApplicationWindow):
     @Gtk.Template.Callback()
     def on_apply_clicked(self, button):
         """Write changes back to sysfs"""
-        ret = -1
-        cpu = self._get_active_cpu()
-        conf = self.settings[cpu]
-        fmin, fmax = conf.freqs_scaled
-        gov = conf.governor
-        pref = conf.energy_pref
-
-        if not HELPER.isauthorized():
+        if not HELPER.isauthorized(timeout=CALL_TIMEOUT):
             error_message(_("You don't have permissions to update cpu settings!"), self)
 
         # Update only the cpus whose settings were changed
-        changed_cpus = [cpu for cpu, conf in self.settings.items() if conf.changed]
-        for cpu in changed_cpus:
-            conf = self.settings.get(cpu)
-            cpu_online = conf.online
-            ret = self.set_cpu_online(cpu)
-            if cpu_online:
+        request = {}
+        for cpu, conf in self.settings.items():
+            if not conf.changed:
+                continue
+            fmin = fmax = 0
+            gov = pref = ""
+            if conf.online:
                 if conf.setting_changed("freqs"):
-                    ret += self.set_cpu_frequencies(cpu)
-                if conf.setting_changed("governor"):
-                    ret += self.set_cpu_governor(cpu)
-                if conf.setting_changed("energy_pref"):
-                    ret += self.set_cpu_energy_preferences(cpu)
-
+                    fmin, fmax = conf.freqs_scaled
+                # If governor is None means that there is an error with the kernel
+                # https://github.com/vagnum08/cpupower-gui/issues/12
+                if conf.setting_changed("governor") and conf.governor:
+                    gov = conf.governor
+                if self.energy_pref_avail and conf.setting_changed("energy_pref"):
+                    pref = conf.energy_pref
+            request[cpu] = (fmin, fmax, gov, conf.online, pref)
+
+        # Nothing is kept if any setting fails
+        _, results, _ = apply_cpu_settings_transaction(request)
+        ret = next((code for code in results.values() if code), 0)
+
+        topology = CpuTopologySnapshot()
+        states = read_cpu_states(self.settings.keys(), topology)
         for cpu in self.settings.keys():
-            self._refresh_cpu_settings(cpu)
+            self._refresh_cpu_settings(cpu, topology, states[cpu])
 
         # Update sliders
         self.profile_box.set_selected_index(0)
@@ -939,7 +1081,7 @@ class CpupowerGuiWindow(Gtk.ApplicationWindow):
         if ret == 0:
             button.set_sensitive(False)
         else:
-            error = ERRORS[ret]
+            error = ERRORS.get(ret, _("Applying settings failed."))
             error_message(error, self)
 
     def on_prof_name_changed(self, entry, button):
@@ -1010,8 +1152,8 @@ class CpupowerGuiWindow(Gtk.ApplicationWindow):
 
         """
 
-        online = HELPER.get_cpus_online()
-        present = HELPER.get_cpus_present()
+        online = CpuSet(HELPER.get_cpus_online())
+        present = CpuSet(HELPER.get_cpus_present())
         return (cpu in present) and (cpu in online)
 
     @staticmethod
@@ -1025,8 +1167,8 @@ class CpupowerGuiWindow(Gtk.ApplicationWindow):
             bool: True if cpu is offline, false otherwise
 
         """
-        offline = HELPER.get_cpus_offline()
-        present = HELPER.get_cpus_present()
+        offline = CpuSet(HELPER.get_cpus_offline())
+        present = CpuSet(HELPER.get_cpus_present())
         return (cpu in present) and (cpu in offline)
 
     @staticmethod
@@ -1043,20 +1185,19 @@ class CpupowerGuiWindow(Gtk.ApplicationWindow):
 
         return governors
 
-    @staticmethod
-    def get_cpu_frequency_steps(cpu):
+    def get_cpu_frequency_steps(self, cpu):
         """Wrapper to get the list of available frequencies
 
         Args:
             cpu: Index of cpu to query
 
         """
-        frequencies = read_available_frequencies(cpu)
-        if not frequencies:
+        conf = self.settings.get(cpu)
+        if conf is None:
             return []
 
-        # Convert and scale frequencies to MHz
-        return [int(freq) / 1e3 for freq in frequencies]
+        # Frequencies scaled to MHz
+        return conf.frequencies
 
     @staticmethod
     def conv_float(col, cell, model, treeiter, data):
@@ -1064,104 +1205,6 @@ class CpupowerGuiWindow(Gtk.ApplicationWindow):
         val = model.get(treeiter, data)[0]
         cell.set_property("text", "{:.2f}".format(val))
 
-    def set_cpu_online(self, cpu):
-        """Sets the online attribute for cpu
-
-        Args:
-            cpu: Index of cpu to set
-
-        """
-        conf = self.settings.get(cpu)
-        if conf is None:
-            return
-
-        cpu_online = conf.online
-
-        # If cpu is offline, enable and update freq settings
-        if self.is_offline(cpu) and cpu_online:
-            ret = HELPER.set_cpu_online(cpu)
-            self.upd_sliders()
-            return ret
-
-        # If cpu is online, disable
-        if self.is_online(cpu) and not cpu_online:
-            # Set offline only if CPU is allowed to go offline
-            if HELPER.cpu_allowed_offline(cpu):
-                return HELPER.set_cpu_offline(cpu)
-
-        # No change to the cpu
-        return 0
-
-    def set_cpu_governor(self, cpu):
-        """Sets the governor for cpu
-
-        Args:
-            cpu: Index of cpu to set
-
-        """
-        ret = -1
-        conf = self.settings.get(cpu)
-        if conf is None:
-            return ret
-
-        gov = conf.governor
-        # If govid is None means that there is an error with the kernel
-        # https://github.com/vagnum08/cpupower-gui/issues/12
-        if gov is None:
-            return ret
-
-        ret = HELPER.update_cpu_governor(cpu, gov)
-
-        if ret != 0:
-            return -11
-        return ret
-
-    def set_cpu_energy_preferences(self, cpu):
-        """Sets the energy performance preference for cpu
-
-        Args:
-            cpu: Index of cpu to set
-
-        """
-
-        # Return success if not available
-        if not self.energy_pref_avail:
-            return 0
-
-        ret = -1
-        conf = self.settings.get(cpu)
-        if conf is None:
-            return ret
-
-        pref = conf.energy_pref
-        if not pref:
-            return ret
-
-        ret = HELPER.update_cpu_energy_prefs(cpu, pref)
-
-        if ret != 0:
-            return -12
-        return ret
-
-    def set_cpu_frequencies(self, cpu):
-        """Sets the frequency limits for cpu
-
-        Args:
-            cpu: Index of cpu to set
-
-        """
-        ret = -1
-        conf = self.settings.get(cpu)
-        if conf is None:
-            return ret
-
-        fmin, fmax = conf.freqs_scaled
-        if (fmin is not None) and (fmax is not None):
-            ret = HELPER.update_cpu_settings(cpu, fmin, fmax)
-        if ret != 0:
-            return -13
-        return ret
-
     def on_freq_editing_started(self, renderer, editable, path):
         self._editing_cpu = int(path)
 